@@ -4,6 +4,9 @@ import os
 import re
 from collections import defaultdict
 
+# Text and span style only: image blocks are never used here
+OUTLINE_TEXT_FLAGS = pymupdf.TEXTFLAGS_DICT & ~pymupdf.TEXT_PRESERVE_IMAGES
+
 def extract_headings_and_title(pdf_path):
     document = pymupdf.open(pdf_path)
 
@@ -14,7 +17,7 @@ def extract_headings_and_title(pdf_path):
     all_lines_data = []
 
     for page_number, page in enumerate(document):
-        blocks = page.get_text("dict")["blocks"]
+        blocks = page.get_text("dict", flags=OUTLINE_TEXT_FLAGS)["blocks"]
         for block in blocks:
             if block["type"] == 0:
                 for line_idx, line in enumerate(block["lines"]):
@@ -7,6 +7,9 @@ import time
 import logging
 from datetime import datetime
 
+# Text and span style only: image blocks are never used here
+OUTLINE_TEXT_FLAGS = pymupdf.TEXTFLAGS_DICT & ~pymupdf.TEXT_PRESERVE_IMAGES
+
 # Set up logging for debugging and performance tracking
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
@@ -28,7 +31,7 @@ def extract_keywords(persona, job_to_be_done):
 def process_page(page, page_number):
     """Process a single page to extract text lines with metadata."""
     try:
-        blocks = page.get_text("dict")["blocks"]
+        blocks = page.get_text("dict", flags=OUTLINE_TEXT_FLAGS)["blocks"]
         lines_data = []
         for block in blocks:
             if block["type"] == 0:  # Text block
@@ -55,6 +58,7 @@ def process_page(page, page_number):
 
 def extract_headings_and_content(pdf_path):
     """Extract structured outline and section content from a PDF."""
+    start_time = time.time()
     try:
         document = pymupdf.open(pdf_path)
     except Exception as e:
@@ -70,7 +74,7 @@ def extract_headings_and_content(pdf_path):
     toc = document.get_toc(simple=False)
     toc_headings = [
         {"level": f"H{min(level, 3)}", "text": title, "page": page}
-        for level, title, page in toc if page > 0 and title.strip()
+        for level, title, page, _ in toc if page > 0 and title.strip()
     ]
 
     # Process pages sequentially
@@ -207,6 +211,11 @@ def extract_headings_and_content(pdf_path):
         level = f"H{i+1}"
         heading_level_ranges[level] = (min(cluster), max(cluster))
 
+    # Index headings by (text, page) so each line is matched in O(1); the first heading wins
+    heading_index = {}
+    for heading in potential_headings:
+        heading_index.setdefault((heading["text"], heading["page"]), heading)
+
     # Assign heading levels and collect section content
     final_headings = []
     section_content = []
@@ -220,16 +229,15 @@ def extract_headings_and_content(pdf_path):
         confidence = 0.0
 
         # Check if line is a heading
-        for heading in potential_headings:
-            if heading["text"] == text and heading["page"] == page_num:
-                confidence = heading["confidence"]
-                for level, (min_size, max_size) in heading_level_ranges.items():
-                    if min_size <= font_size <= max_size:
-                        assigned_level = level
-                        break
-                if not assigned_level and confidence > 0.3:
-                    assigned_level = "H3"
-                break
+        heading = heading_index.get((text, page_num))
+        if heading is not None:
+            confidence = heading["confidence"]
+            for level, (min_size, max_size) in heading_level_ranges.items():
+                if min_size <= font_size <= max_size:
+                    assigned_level = level
+                    break
+            if not assigned_level and confidence > 0.3:
+                assigned_level = "H3"
 
         if assigned_level:
             if current_section:
@@ -0,0 +1,71 @@
+"""Benchmark the scalar and vectorized compute_heading_confidence paths on synthetic documents."""
+import argparse
+import os
+import sys
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from heading_detector import compute_heading_confidence
+from line_table import LineTable
+
+WORDS = ["data", "section", "overview", "results", "method", "analysis", "travel", "guide", "notes", "summary"]
+PREFIXES = ["", "", "", "1.2 ", "A. ", "IV. ", "Chapter ", "", "---", ""]
+FONT_SIZES = [7.5, 9.0, 10.0, 11.0, 12.0, 14.0, 18.0, 24.0]
+
+
+def synthetic_line_table(line_count, lines_per_page=45, seed=0):
+    """Build a LineTable with page-ordered lines and a realistic mix of fonts, spacing and text patterns."""
+    rng = np.random.default_rng(seed)
+    page_number = np.arange(line_count) // lines_per_page + 1
+    position_on_page = np.arange(line_count) % lines_per_page
+    font_size = rng.choice(FONT_SIZES, size=line_count, p=[0.05, 0.2, 0.35, 0.15, 0.1, 0.07, 0.05, 0.03])
+    y0 = np.round(40 + position_on_page * 16 + rng.uniform(0, 12, size=line_count), 2)
+    y1 = np.round(y0 + font_size * 1.2, 2)
+    x0 = np.round(rng.choice([36.0, 72.0, 150.0], size=line_count), 2)
+    x1 = np.round(x0 + rng.uniform(50, 450, size=line_count), 2)
+    word_counts = rng.integers(1, 20, size=line_count)
+    prefixes = rng.integers(0, len(PREFIXES), size=line_count)
+    texts = []
+    for count, prefix in zip(word_counts.tolist(), prefixes.tolist()):
+        words = " ".join(WORDS[(count + k) % len(WORDS)] for k in range(count))
+        texts.append(PREFIXES[prefix] + (words.upper() if count % 7 == 0 else words))
+    return LineTable(texts, font_size, x0, y0, x1, y1, page_number, rng.random(line_count) < 0.15)
+
+
+def best_of(repeats, function, *args):
+    """Return the best wall-clock time over several runs and the last result."""
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = function(*args)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000],
+                        help="Line counts to benchmark")
+    parser.add_argument("--repeats", type=int, default=3, help="Runs per measurement; the best is reported")
+    parser.add_argument("--max-scalar-lines", type=int, default=1_000_000,
+                        help="Skip the scalar path above this many lines")
+    args = parser.parse_args(argv)
+
+    print(f"{'lines':>10} {'scalar (s)':>12} {'vectorized (s)':>15} {'speedup':>9}")
+    for size in args.sizes:
+        table = synthetic_line_table(size)
+        vectorized_time, vectorized_result = best_of(args.repeats, compute_heading_confidence, table, "Untitled Document")
+        if size > args.max_scalar_lines:
+            print(f"{size:>10} {'-':>12} {vectorized_time:>15.3f} {'-':>9}")
+            continue
+        records = table.to_records()
+        scalar_time, scalar_result = best_of(args.repeats, compute_heading_confidence, records, "Untitled Document")
+        if scalar_result != vectorized_result:
+            raise SystemExit(f"Scalar and vectorized results differ for {size} lines")
+        print(f"{size:>10} {scalar_time:>12.3f} {vectorized_time:>15.3f} {scalar_time / vectorized_time:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
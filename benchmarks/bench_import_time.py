@@ -0,0 +1,59 @@
+"""Benchmark module import times in fresh interpreters and check the Round 1A path stays free of heavy imports."""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MODULES = ["heading_detector", "output_handler", "pdf_processor", "process_pdfs", "semantic_analyzer", "main"]
+# None of these may import the packages below; semantic_analyzer and main load them on first use
+LIGHT_MODULES = set(MODULES)
+HEAVY_MODULES = ["torch", "sentence_transformers", "transformers", "sklearn", "sumy", "nltk"]
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(json.dumps({{"seconds": elapsed, "heavy": [name for name in {heavy!r} if name in sys.modules]}}))
+"""
+
+
+def time_import(module, repeats):
+    """Import module in fresh interpreters; return the best time and the heavy packages it pulled in."""
+    best = float("inf")
+    heavy = []
+    for _ in range(repeats):
+        completed = subprocess.run([sys.executable, "-c", PROBE.format(module=module, heavy=HEAVY_MODULES)],
+                                   cwd=REPO_DIR, capture_output=True, text=True, check=True)
+        result = json.loads(completed.stdout.strip().splitlines()[-1])
+        best = min(best, result["seconds"])
+        heavy = result["heavy"]
+    return best, heavy
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--modules", nargs="+", default=MODULES, help="Modules to import")
+    parser.add_argument("--repeats", type=int, default=5, help="Fresh interpreters per module; the best is reported")
+    parser.add_argument("--max-ms", type=float, default=None,
+                        help="Fail if any module takes longer than this to import")
+    args = parser.parse_args(argv)
+
+    failures = []
+    print(f"{'module':>20} {'import (ms)':>12}  heavy modules")
+    for module in args.modules:
+        seconds, heavy = time_import(module, args.repeats)
+        print(f"{module:>20} {seconds * 1000:>12.1f}  {', '.join(heavy) or '-'}")
+        if heavy and module in LIGHT_MODULES:
+            failures.append(f"{module} imports {', '.join(heavy)}")
+        if args.max_ms is not None and seconds * 1000 > args.max_ms:
+            failures.append(f"{module} took {seconds * 1000:.1f} ms (limit {args.max_ms:.1f} ms)")
+    if failures:
+        raise SystemExit("Import regressions:\n" + "\n".join(failures))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+import os
+import json
+import time
+import argparse
+import tempfile
+import numpy as np
+from output_handler import load_queries, build_output
+from embedding_cache import normalize_text
+from semantic_analyzer import (DEFAULT_BATCH_SIZE, DEFAULT_MODEL_NAME, load_model, encode_texts, unique_texts,
+                               summarize_text, rank_by_scores)
+
+# Bump whenever the files written by ingest change
+INDEX_VERSION = 1
+INDEX_FILENAME = "index.json"
+RECORDS_FILENAME = "records.ndjson"
+EMBEDDINGS_FILENAME = "embeddings.npy"
+
+
+def ingest(results, index_dir, model, model_name=DEFAULT_MODEL_NAME, batch_size=DEFAULT_BATCH_SIZE,
+           embedding_cache=None):
+    """Embed and summarize the sections of parsed PDFs (main.parse_pdfs results) into a self-contained index directory."""
+    records = []
+    for result in results:
+        document = os.path.basename(result["pdf_path"])
+        for section in result["sections"]:
+            records.append({"kind": "section", "document": document, "page_number": section["page_number"],
+                            "section_title": section["section_title"], "text": section["text"]})
+    for result in results:
+        document = os.path.basename(result["pdf_path"])
+        for subsection in result["subsections"]:
+            records.append({"kind": "subsection", "document": document, "page_number": subsection["page_number"],
+                            "text": subsection["text"]})
+
+    # Each distinct text gets one embedding row; records point at their row
+    unique, inverse = unique_texts([record["text"] for record in records])
+    embeddings = encode_texts(unique, model, batch_size, embedding_cache) if unique else np.zeros((0, 0), np.float32)
+    summaries = {}
+    for record, row in zip(records, inverse):
+        record["row"] = row
+        if record["kind"] == "subsection":
+            key = normalize_text(record["text"])
+            if key not in summaries:
+                summaries[key] = summarize_text(record["text"], sentences_count=1)
+            record["refined_text"] = summaries[key]
+        del record["text"]
+
+    os.makedirs(index_dir, exist_ok=True)
+    # Without index.json the directory is never loaded, so an interrupted re-ingest cannot
+    # leave the previous metadata pointing at half-written records and embeddings
+    index_path = os.path.join(index_dir, INDEX_FILENAME)
+    if os.path.exists(index_path):
+        os.remove(index_path)
+    np.save(os.path.join(index_dir, EMBEDDINGS_FILENAME), np.ascontiguousarray(embeddings, dtype=np.float32))
+    with open(os.path.join(index_dir, RECORDS_FILENAME), 'w', encoding='utf-8') as f:
+        for record in records:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+    # Written last and atomically: an index without it is incomplete and is never loaded
+    fd, tmp_path = tempfile.mkstemp(dir=index_dir, suffix=".tmp")
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        json.dump({
+            "version": INDEX_VERSION,
+            "model": model_name,
+            "documents": [os.path.basename(result["pdf_path"]) for result in results],
+            "records": len(records),
+            "embeddings": list(embeddings.shape)
+        }, f, indent=4, ensure_ascii=False)
+    os.replace(tmp_path, index_path)
+    return len(records), len(unique)
+
+
+def load_index(index_dir):
+    """Load an index's metadata and records, with the embeddings memory-mapped rather than read."""
+    with open(os.path.join(index_dir, INDEX_FILENAME), 'r', encoding='utf-8') as f:
+        index = json.load(f)
+    if index.get("version") != INDEX_VERSION:
+        raise ValueError(f"{index_dir} was written by index version {index.get('version')}, expected {INDEX_VERSION}")
+    with open(os.path.join(index_dir, RECORDS_FILENAME), 'r', encoding='utf-8') as f:
+        records = [json.loads(line) for line in f]
+    embeddings = np.load(os.path.join(index_dir, EMBEDDINGS_FILENAME), mmap_mode="r")
+    return index, records, embeddings
+
+
+def query_index(index, records, embeddings, job_descriptions, model, batch_size=DEFAULT_BATCH_SIZE, cache=None):
+    """Rank the indexed sections and subsections for each job description; returns one ranking per job."""
+    sections = [record for record in records if record["kind"] == "section"]
+    subsections = [record for record in records if record["kind"] == "subsection"]
+    rows = np.array([record["row"] for record in sections + subsections], dtype=np.int64)
+    refined_texts = [record["refined_text"] for record in subsections]
+
+    # Same float64 product as rank_sections_for_queries, so results match a full run
+    job_embeddings = encode_texts(job_descriptions, model, batch_size, cache)
+    scores = np.zeros((len(job_descriptions), 0), dtype=np.float32)
+    if len(embeddings):
+        scores = (job_embeddings.astype(np.float64) @ np.asarray(embeddings).T.astype(np.float64)).astype(np.float32)
+        scores = scores[:, rows]
+    return [rank_by_scores(sections, subsections, query_scores, refined_texts) for query_scores in scores]
+
+
+def parse_args(argv=None):
+    """Parse command-line options."""
+    parser = argparse.ArgumentParser(description="Build a collection index once, then answer persona/job queries from it.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    ingest_parser = commands.add_parser("ingest", help="Parse, embed and summarize a directory of PDFs into an index")
+    ingest_parser.add_argument("input_dir", help="Directory containing the PDFs")
+    ingest_parser.add_argument("index_dir", help="Directory the index is written to")
+    ingest_parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE,
+                               help="Number of texts per embedding batch")
+    ingest_parser.add_argument("--workers", type=int, default=1,
+                               help="Number of processes used to parse PDFs in parallel")
+    ingest_parser.add_argument("--cache-dir", default=None,
+                               help="Directory for the persistent embedding and extraction caches (default: none)")
+    ingest_parser.add_argument("--use-toc", action="store_true",
+                               help="Take headings from a sufficiently complete embedded TOC instead of scoring every line")
+
+    query_parser = commands.add_parser("query", help="Rank an index's sections for a persona and job")
+    query_parser.add_argument("index_dir", help="Directory written by ingest")
+    query_parser.add_argument("--config", default=None,
+                              help="config.json with persona and job_to_be_done, or a list of queries")
+    query_parser.add_argument("--persona", default=None, help="Persona, when no --config is given")
+    query_parser.add_argument("--job", default=None, help="Job to be done, when no --config is given")
+    query_parser.add_argument("--output-dir", default=".", help="Directory the output JSON files are written to")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """Run the ingest or query command."""
+    args = parse_args(argv)
+    start = time.perf_counter()
+
+    if args.command == "ingest":
+        pdf_paths = [os.path.join(args.input_dir, filename) for filename in sorted(os.listdir(args.input_dir))
+                     if filename.endswith(".pdf")]
+        embedding_cache = None
+        extraction_cache_dir = None
+        if args.cache_dir:
+            from embedding_cache import EmbeddingCache
+            embedding_cache = EmbeddingCache(os.path.join(args.cache_dir, "embeddings.sqlite"), DEFAULT_MODEL_NAME)
+            extraction_cache_dir = os.path.join(args.cache_dir, "extraction")
+        # PyMuPDF and the parsing pipeline are only needed here, never by query
+        from main import parse_pdfs
+        # Parse before loading the model so the worker pool never forks a process holding it
+        results = parse_pdfs(pdf_paths, extraction_cache_dir, args.workers, use_toc=args.use_toc)
+        model = load_model(DEFAULT_MODEL_NAME)
+        record_count, embedded_count = ingest(results, args.index_dir, model, DEFAULT_MODEL_NAME, args.batch_size,
+                                              embedding_cache)
+        if embedding_cache is not None:
+            embedding_cache.close()
+        print(f"Indexed {len(pdf_paths)} PDFs: {record_count} sections and paragraphs, {embedded_count} embeddings "
+              f"in {time.perf_counter() - start:.1f} s")
+        return
+
+    if args.config:
+        with open(args.config, 'r', encoding='utf-8') as f:
+            queries = load_queries(json.load(f))
+    elif args.persona is not None and args.job is not None:
+        queries = load_queries({"persona": args.persona, "job_to_be_done": args.job})
+    else:
+        raise SystemExit("query needs --config, or both --persona and --job")
+
+    index, records, embeddings = load_index(args.index_dir)
+    loaded = time.perf_counter()
+    model = load_model(index["model"])
+    model_loaded = time.perf_counter()
+    rankings = query_index(index, records, embeddings, [query["job_to_be_done"] for query in queries], model)
+    ranked = time.perf_counter()
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    for query, (sections, subsections) in zip(queries, rankings):
+        output = build_output(query["persona"], query["job_to_be_done"], index["documents"], sections, subsections)
+        output_path = os.path.join(args.output_dir, query["output_filename"])
+        with open(output_path, 'w', encoding='utf-8') as f:
+            json.dump(output, f, indent=4, ensure_ascii=False)
+        print(f"Round 1B output saved to: {output_path}")
+    print(f"Index load {(loaded - start) * 1000:.1f} ms, model {(model_loaded - loaded) * 1000:.1f} ms, "
+          f"ranking {(ranked - model_loaded) * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+import hashlib
+import os
+import sqlite3
+import time
+import numpy as np
+
+DEFAULT_MAX_ENTRIES = 200000
+SQLITE_MAX_PARAMS = 500
+
+def normalize_text(text):
+    """Collapse whitespace so texts differing only in layout share one cache entry."""
+    return " ".join(text.split())
+
+def text_hash(text):
+    """Return the SHA-256 hex digest of the normalized text."""
+    return hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest()
+
+class EmbeddingCache:
+    """Persistent SQLite embedding cache keyed by (model name, normalized text hash) with LRU eviction."""
+
+    def __init__(self, path, model_name, max_entries=DEFAULT_MAX_ENTRIES):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.model_name = model_name
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.connection = sqlite3.connect(path, timeout=30)
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "model TEXT NOT NULL, text_hash TEXT NOT NULL, dim INTEGER NOT NULL, "
+            "vector BLOB NOT NULL, last_used REAL NOT NULL, PRIMARY KEY (model, text_hash))"
+        )
+        self.connection.execute("CREATE INDEX IF NOT EXISTS embeddings_last_used ON embeddings (last_used)")
+        self.connection.commit()
+
+    def get_many(self, texts):
+        """Return {position: vector} for the texts that are cached and refresh their recency."""
+        positions_by_hash = {}
+        for i, text in enumerate(texts):
+            positions_by_hash.setdefault(text_hash(text), []).append(i)
+
+        found = {}
+        hashes = list(positions_by_hash)
+        for start in range(0, len(hashes), SQLITE_MAX_PARAMS):
+            chunk = hashes[start:start + SQLITE_MAX_PARAMS]
+            rows = self.connection.execute(
+                f"SELECT text_hash, dim, vector FROM embeddings WHERE model = ? AND text_hash IN ({','.join('?' * len(chunk))})",
+                [self.model_name] + chunk
+            ).fetchall()
+            for key, dim, blob in rows:
+                vector = np.frombuffer(blob, dtype=np.float32, count=dim)
+                for i in positions_by_hash[key]:
+                    found[i] = vector
+            if rows:
+                now = time.time()
+                self.connection.executemany(
+                    "UPDATE embeddings SET last_used = ? WHERE model = ? AND text_hash = ?",
+                    [(now, self.model_name, key) for key, _, _ in rows]
+                )
+        self.connection.commit()
+
+        self.hits += len(found)
+        self.misses += len(texts) - len(found)
+        return found
+
+    def put_many(self, texts, vectors):
+        """Store embeddings for the given texts and evict least recently used entries over the limit."""
+        now = time.time()
+        self.connection.executemany(
+            "INSERT OR REPLACE INTO embeddings (model, text_hash, dim, vector, last_used) VALUES (?, ?, ?, ?, ?)",
+            [(self.model_name, text_hash(text), len(vector), np.asarray(vector, dtype=np.float32).tobytes(), now)
+             for text, vector in zip(texts, vectors)]
+        )
+        self.evict()
+        self.connection.commit()
+
+    def evict(self):
+        """Delete the least recently used entries until the cache fits max_entries."""
+        count = self.connection.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        if count > self.max_entries:
+            self.connection.execute(
+                "DELETE FROM embeddings WHERE rowid IN (SELECT rowid FROM embeddings ORDER BY last_used ASC LIMIT ?)",
+                (count - self.max_entries,)
+            )
+
+    def stats(self):
+        """Return hit/miss counters and the current number of stored entries."""
+        entries = self.connection.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        return {"hits": self.hits, "misses": self.misses, "entries": entries}
+
+    def close(self):
+        """Close the underlying database connection."""
+        self.connection.close()
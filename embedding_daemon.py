@@ -0,0 +1,284 @@
+"""Keep the embedding model resident and serve batched encode requests over a Unix domain socket.
+
+Start it once with `python embedding_daemon.py serve`; semantic_analyzer.load_model then uses it
+automatically and falls back to loading the model in-process when no daemon is listening.
+"""
+import argparse
+import json
+import os
+import queue
+import socket
+import socketserver
+import struct
+import threading
+import time
+import numpy as np
+
+DEFAULT_SOCKET_PATH = os.environ.get("EMBEDDING_DAEMON_SOCKET", "/tmp/embedding-daemon.sock")
+# Requests arriving within this window are encoded together, up to MAX_BATCH_TEXTS texts
+BATCH_WINDOW_SECONDS = 0.005
+MAX_BATCH_TEXTS = 512
+CONNECT_TIMEOUT_SECONDS = 1.0
+
+FRAME_HEADER = struct.Struct("!II")
+
+def send_message(sock, header, payload=b""):
+    """Send a JSON header and a binary payload as one length-prefixed frame."""
+    encoded = json.dumps(header).encode("utf-8")
+    sock.sendall(FRAME_HEADER.pack(len(encoded), len(payload)) + encoded + payload)
+
+def _recv_exactly(sock, size):
+    chunks = []
+    while size:
+        chunk = sock.recv(min(size, 1 << 20))
+        if not chunk:
+            raise ConnectionError("connection closed mid-message")
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b"".join(chunks)
+
+def recv_message(sock):
+    """Receive one frame; returns (header, payload), or (None, b"") if the peer closed the connection."""
+    prefix = sock.recv(FRAME_HEADER.size)
+    if not prefix:
+        return None, b""
+    if len(prefix) < FRAME_HEADER.size:
+        prefix += _recv_exactly(sock, FRAME_HEADER.size - len(prefix))
+    header_size, payload_size = FRAME_HEADER.unpack(prefix)
+    header = json.loads(_recv_exactly(sock, header_size).decode("utf-8"))
+    return header, _recv_exactly(sock, payload_size)
+
+class EmbeddingDaemon:
+    """Single model worker fed by a request queue; concurrent requests are coalesced into shared batches."""
+
+    def __init__(self, model, model_name, socket_path=DEFAULT_SOCKET_PATH, batch_window=BATCH_WINDOW_SECONDS,
+                 max_batch_texts=MAX_BATCH_TEXTS, verbose=True):
+        self.model = model
+        self.model_name = model_name
+        self.socket_path = socket_path
+        self.batch_window = batch_window
+        self.max_batch_texts = max_batch_texts
+        self.verbose = verbose
+        self.jobs = queue.Queue()
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.batches = 0
+        self.texts = 0
+        self.max_batch_seen = 0
+        self.queue_seconds_total = 0.0
+        self.queue_seconds_max = 0.0
+        self.server = None
+
+    def encode(self, texts, batch_size):
+        """Queue texts for the model worker and wait; returns (embeddings, queue seconds, batch size)."""
+        job = {"texts": texts, "batch_size": batch_size, "enqueued": time.perf_counter(), "done": threading.Event()}
+        self.jobs.put(job)
+        job["done"].wait()
+        if "error" in job:
+            raise RuntimeError(job["error"])
+        return job["embeddings"], job["queue_seconds"], job["batch_texts"]
+
+    def _next_batch(self):
+        """Block for one job, then gather whatever else arrives within the batch window."""
+        jobs = [self.jobs.get()]
+        text_count = len(jobs[0]["texts"])
+        deadline = time.perf_counter() + self.batch_window
+        while text_count < self.max_batch_texts:
+            timeout = deadline - time.perf_counter()
+            if timeout <= 0:
+                break
+            try:
+                job = self.jobs.get(timeout=timeout)
+            except queue.Empty:
+                break
+            jobs.append(job)
+            text_count += len(job["texts"])
+        return jobs
+
+    def run_worker(self):
+        """Encode queued requests batch by batch; runs on its own thread for the life of the daemon."""
+        while True:
+            jobs = self._next_batch()
+            started = time.perf_counter()
+            texts = [text for job in jobs for text in job["texts"]]
+            try:
+                embeddings = np.asarray(self.model.encode(texts, batch_size=max(job["batch_size"] for job in jobs),
+                                                          show_progress_bar=False), dtype=np.float32)
+            except Exception as error:
+                for job in jobs:
+                    job["error"] = f"{type(error).__name__}: {error}"
+                    job["done"].set()
+                continue
+
+            encode_seconds = time.perf_counter() - started
+            queue_seconds = [started - job["enqueued"] for job in jobs]
+            with self.lock:
+                self.requests += len(jobs)
+                self.batches += 1
+                self.texts += len(texts)
+                self.max_batch_seen = max(self.max_batch_seen, len(texts))
+                self.queue_seconds_total += sum(queue_seconds)
+                self.queue_seconds_max = max([self.queue_seconds_max] + queue_seconds)
+            if self.verbose:
+                print(f"Batch of {len(texts)} texts from {len(jobs)} requests: "
+                      f"queue {max(queue_seconds) * 1000:.1f} ms, encode {encode_seconds * 1000:.1f} ms")
+
+            start = 0
+            for job, waited in zip(jobs, queue_seconds):
+                job["embeddings"] = embeddings[start:start + len(job["texts"])]
+                job["queue_seconds"] = waited
+                job["batch_texts"] = len(texts)
+                start += len(job["texts"])
+                job["done"].set()
+
+    def stats(self):
+        """Return request, batch-size and queue-latency counters."""
+        with self.lock:
+            return {
+                "model": self.model_name,
+                "requests": self.requests,
+                "batches": self.batches,
+                "texts": self.texts,
+                "mean_batch_texts": self.texts / self.batches if self.batches else 0.0,
+                "max_batch_texts": self.max_batch_seen,
+                "mean_queue_ms": self.queue_seconds_total / self.requests * 1000 if self.requests else 0.0,
+                "max_queue_ms": self.queue_seconds_max * 1000,
+                "queued": self.jobs.qsize()
+            }
+
+    def serve_forever(self):
+        """Bind the socket (owner-only) and serve until interrupted."""
+        if os.path.exists(self.socket_path):
+            os.remove(self.socket_path)
+        daemon = self
+
+        class Handler(socketserver.BaseRequestHandler):
+            def handle(self):
+                while True:
+                    header, payload = recv_message(self.request)
+                    if header is None:
+                        return
+                    if header.get("op") == "encode":
+                        try:
+                            embeddings, queue_seconds, batch_texts = daemon.encode(header["texts"],
+                                                                                   header.get("batch_size", 32))
+                        except RuntimeError as error:
+                            send_message(self.request, {"error": str(error)})
+                            continue
+                        send_message(self.request, {"shape": list(embeddings.shape), "queue_seconds": queue_seconds,
+                                                    "batch_texts": batch_texts}, embeddings.tobytes())
+                    elif header.get("op") == "stats":
+                        send_message(self.request, daemon.stats())
+                    else:
+                        send_message(self.request, {"model": daemon.model_name})
+
+        previous_umask = os.umask(0o177)
+        try:
+            self.server = socketserver.ThreadingUnixStreamServer(self.socket_path, Handler)
+        finally:
+            os.umask(previous_umask)
+        self.server.daemon_threads = True
+        threading.Thread(target=self.run_worker, daemon=True).start()
+        try:
+            self.server.serve_forever()
+        finally:
+            self.server.server_close()
+            if os.path.exists(self.socket_path):
+                os.remove(self.socket_path)
+
+class DaemonModel:
+    """Stand-in for SentenceTransformer whose encode() is served by a running embedding daemon."""
+
+    def __init__(self, sock, model_name, socket_path):
+        self.sock = sock
+        self.model_name = model_name
+        self.socket_path = socket_path
+        self.requests = 0
+        self.batch_texts = []
+        self.queue_seconds = []
+
+    def encode(self, texts, batch_size=32, show_progress_bar=False, **kwargs):
+        """Encode texts on the daemon and return the raw float32 embeddings."""
+        texts = list(texts)
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+        send_message(self.sock, {"op": "encode", "texts": texts, "batch_size": batch_size})
+        header, payload = recv_message(self.sock)
+        if header is None:
+            raise ConnectionError("embedding daemon closed the connection")
+        if "error" in header:
+            raise RuntimeError(f"embedding daemon failed: {header['error']}")
+        self.requests += 1
+        self.batch_texts.append(header["batch_texts"])
+        self.queue_seconds.append(header["queue_seconds"])
+        return np.frombuffer(payload, dtype=np.float32).reshape(header["shape"])
+
+    def stats(self):
+        """Return this client's request count, daemon batch sizes and queue latency."""
+        return {
+            "requests": self.requests,
+            "mean_batch_texts": sum(self.batch_texts) / self.requests if self.requests else 0.0,
+            "mean_queue_ms": sum(self.queue_seconds) / self.requests * 1000 if self.requests else 0.0,
+            "max_queue_ms": max(self.queue_seconds, default=0.0) * 1000
+        }
+
+    def close(self):
+        """Close the connection to the daemon."""
+        self.sock.close()
+
+def _request(socket_path, header):
+    """Send one request on a fresh connection and return the reply header."""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(CONNECT_TIMEOUT_SECONDS)
+        sock.connect(socket_path)
+        send_message(sock, header)
+        return recv_message(sock)[0]
+
+def connect_daemon(model_name, socket_path=DEFAULT_SOCKET_PATH):
+    """Return a DaemonModel if a daemon serving model_name is listening at socket_path, otherwise None."""
+    if not os.path.exists(socket_path):
+        return None
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.settimeout(CONNECT_TIMEOUT_SECONDS)
+        sock.connect(socket_path)
+        send_message(sock, {"op": "ping"})
+        header, _ = recv_message(sock)
+    except OSError:
+        sock.close()
+        return None
+    if header is None or header.get("model") != model_name:
+        sock.close()
+        return None
+    # Encoding a large corpus can take far longer than the connect timeout
+    sock.settimeout(None)
+    return DaemonModel(sock, model_name, socket_path)
+
+def main(argv=None):
+    """Run the daemon, or print the statistics of a running one."""
+    parser = argparse.ArgumentParser(description="Serve sentence embeddings over a Unix domain socket.")
+    parser.add_argument("command", choices=["serve", "stats"], help="Start the daemon or query a running one")
+    parser.add_argument("--socket", default=DEFAULT_SOCKET_PATH, help="Unix socket path")
+    parser.add_argument("--model", default=None, help="Sentence-transformers model name")
+    parser.add_argument("--max-batch", type=int, default=MAX_BATCH_TEXTS,
+                        help="Maximum number of texts coalesced into one model batch")
+    parser.add_argument("--batch-window-ms", type=float, default=BATCH_WINDOW_SECONDS * 1000,
+                        help="How long to wait for more requests before encoding a batch")
+    args = parser.parse_args(argv)
+
+    if args.command == "stats":
+        print(json.dumps(_request(args.socket, {"op": "stats"}), indent=4))
+        return
+
+    from semantic_analyzer import DEFAULT_MODEL_NAME, load_model
+    model_name = args.model or DEFAULT_MODEL_NAME
+    model = load_model(model_name, use_daemon=False)
+    daemon = EmbeddingDaemon(model, model_name, args.socket, args.batch_window_ms / 1000, args.max_batch)
+    print(f"Serving {model_name} on {args.socket}")
+    try:
+        daemon.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
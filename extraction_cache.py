@@ -0,0 +1,113 @@
+import hashlib
+import os
+import tempfile
+import numpy as np
+from line_table import LineTable
+
+def file_sha256(path, chunk_size=1 << 20):
+    """Return the SHA-256 hex digest of a file's bytes."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+class ExtractionCache:
+    """Content-addressed cache of extracted line tables stored as compressed .npz files."""
+
+    def __init__(self, cache_dir):
+        os.makedirs(cache_dir, exist_ok=True)
+        self.cache_dir = cache_dir
+        self.hits = 0
+        self.misses = 0
+        self.pages_reused = 0
+
+    def key_for(self, pdf_path, extractor_version):
+        """Build the cache key from the PDF's content hash and the extractor version."""
+        return f"{file_sha256(pdf_path)}-v{extractor_version}"
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key + ".npz")
+
+    def _latest_path(self, pdf_path, extractor_version):
+        name = hashlib.sha256(f"{os.path.abspath(pdf_path)}\0{extractor_version}".encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_dir, name + ".latest")
+
+    def contains(self, key):
+        """Return True if a LineTable is stored for key, without loading it or counting a hit."""
+        return os.path.exists(self._path(key))
+
+    def get(self, key):
+        """Return the cached LineTable for key, or None on a miss."""
+        path = self._path(key)
+        if not os.path.exists(path):
+            self.misses += 1
+            return None
+        with np.load(path) as arrays:
+            table = LineTable.from_arrays(arrays)
+        self.hits += 1
+        return table
+
+    def get_previous(self, pdf_path, extractor_version):
+        """Return (LineTable, page fingerprints) last stored for this path, or None if there is none."""
+        latest_path = self._latest_path(pdf_path, extractor_version)
+        if not os.path.exists(latest_path):
+            return None
+        with open(latest_path, "r", encoding="utf-8") as f:
+            path = self._path(f.read().strip())
+        if not os.path.exists(path):
+            return None
+        with np.load(path) as arrays:
+            if "page_fingerprints" not in arrays.files:
+                return None
+            return LineTable.from_arrays(arrays), arrays["page_fingerprints"].tolist()
+
+    def put(self, key, table, page_fingerprints=None, pdf_path=None, extractor_version=None):
+        """Store a LineTable for key; identical PDFs share a single entry.
+
+        Page fingerprints are stored with the table, and the entry is remembered as the latest
+        for pdf_path so a later, modified version of the file can reuse its unchanged pages.
+        """
+        arrays = table.to_arrays()
+        if page_fingerprints is not None:
+            arrays["page_fingerprints"] = np.asarray(page_fingerprints, dtype=str)
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            np.savez_compressed(f, **arrays)
+        os.replace(tmp_path, self._path(key))
+
+        if pdf_path is not None:
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(key)
+            os.replace(tmp_path, self._latest_path(pdf_path, extractor_version))
+
+    def stats(self):
+        """Return hit/miss counters and the number of pages copied from earlier versions of a file."""
+        return {"hits": self.hits, "misses": self.misses, "pages_reused": self.pages_reused}
+
+class PageStore:
+    """In-memory page tables keyed by page fingerprint, shared by near-duplicate documents in one run."""
+
+    def __init__(self):
+        self.tables = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, page_number):
+        """Return the stored table for key renumbered to page_number, or None on a miss."""
+        table = self.tables.get(key)
+        if table is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return LineTable(table.text, table.font_size, table.x0, table.y0, table.x1, table.y1,
+                         np.full(len(table), page_number, dtype=np.int32), table.is_bold)
+
+    def put(self, key, table):
+        """Store the table extracted for key."""
+        self.tables[key] = table
+
+    def stats(self):
+        """Return hit/miss counters."""
+        return {"hits": self.hits, "misses": self.misses}
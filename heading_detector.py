@@ -1,14 +1,39 @@
 import re
-from collections import defaultdict
+from collections import Counter
+import numpy as np
+from line_table import LineTable
+
+# Numbered-heading, heading-keyword and horizontal-rule checks of _score_lines in one anchored pass
+HEADING_PATTERN = re.compile(
+    r"^(?:(?=(?P<numbered>\s*(?:\d+(?:\.\d+)*|[A-Z]\.?|[IVXLCDM]+\.)\s+)))?"
+    r"(?:(?=(?P<keyword>(?:chapter|section|appendix|introduction|conclusion|references)\s+)))?"
+    r"(?P<rule>[\.\-_—\s]+\Z)?",
+    re.IGNORECASE
+)
+
+# An embedded TOC with fewer entries than this is not trusted over the heuristics
+MIN_TOC_ENTRIES = 3
+# A TOC entry covers its own page and at most this many pages in total before the next entry;
+# pages past that (long gaps, the tail after a truncated TOC) go through the heuristics
+MAX_TOC_PAGE_GAP = 4
+
+# Running headers/footers: lines in the top or bottom margin band of the page whose
+# digit-normalized text recurs at the same quantized height on enough pages
+BOILERPLATE_MARGIN = 0.1
+BOILERPLATE_Y_QUANTUM = 4.0
+BOILERPLATE_MIN_PAGES = 3
+BOILERPLATE_PAGE_FRACTION = 0.5
 
 def merge_lines(all_lines_data):
     """Merge consecutive lines that belong to the same heading based on proximity and style."""
+    if isinstance(all_lines_data, LineTable):
+        return _merge_line_table(all_lines_data)
     if not all_lines_data:
         return []
     
-    all_lines_data.sort(key=lambda x: (x["page_number"], x["line_y0"]))
+    all_lines_data = sorted(all_lines_data, key=lambda x: (x["page_number"], x["line_y0"]))
     merged_lines_data = []
-    current_merged_line = dict(all_lines_data[0])
+    current_merged_line = dict(all_lines_data[0], bbox=list(all_lines_data[0]["bbox"]))
     
     for next_line in all_lines_data[1:]:
         current_line_height = current_merged_line["line_y1"] - current_merged_line["line_y0"]
@@ -32,28 +57,310 @@ def merge_lines(all_lines_data):
             current_merged_line["line_y1"] = next_line["line_y1"]
         else:
             merged_lines_data.append(current_merged_line)
-            current_merged_line = dict(next_line)
+            current_merged_line = dict(next_line, bbox=list(next_line["bbox"]))
     
     merged_lines_data.append(current_merged_line)
     return merged_lines_data
 
-def compute_heading_confidence(lines_data, document_title):
+def _page_stable_order(page_number, y0):
+    """Order rows by page, then stably by y0 within each page, without a full-document sort."""
+    order = np.arange(len(page_number))
+    if np.any(page_number[1:] < page_number[:-1]):
+        order = np.argsort(page_number, kind="stable")
+    page_starts = np.flatnonzero(np.diff(page_number[order])) + 1
+    return np.concatenate([rows[np.argsort(y0[rows], kind="stable")] for rows in np.split(order, page_starts)])
+
+def _merge_line_table(table):
+    """Merge lines of a LineTable with the same rules as merge_lines, returning a new table."""
+    line_count = len(table)
+    if not line_count:
+        return LineTable.empty()
+    
+    table = table.take(_page_stable_order(table.page_number, table.y0))
+    x0, y0, x1, y1, font_size = table.x0, table.y0, table.x1, table.y1, table.font_size
+    is_short = np.array([len(text.split()) <= 3 for text in table.text])
+    
+    # Adjacent-pair merge predicates, exact whenever the previous line starts its own group
+    line_height = y1 - y0
+    vertical_distance = y0[1:] - y1[:-1]
+    same_style = (table.page_number[1:] == table.page_number[:-1]) & (table.is_bold[1:] == table.is_bold[:-1])
+    horizontal_overlap = np.maximum(0, np.minimum(x1[:-1], x1[1:]) - np.maximum(x0[:-1], x0[1:]))
+    min_overlap_width = np.minimum(x1[:-1] - x0[:-1], x1[1:] - x0[1:]) * 0.25
+    is_short_continuation = (is_short[1:] &
+                             (vertical_distance < (line_height[:-1] * 1.0)) &
+                             (np.abs(x0[1:] - x0[:-1]) < 50))
+    merges_with_previous = (same_style &
+                            (vertical_distance < ((line_height[:-1] + line_height[1:]) / 2 * 2.5)) &
+                            (np.abs(font_size[1:] - font_size[:-1]) < 2.0) &
+                            ((horizontal_overlap > min_overlap_width) | is_short_continuation))
+    
+    # Once a group spans several lines the comparison is against its first line (style and
+    # x-extent) and its last line (bottom edge), so resolve groups in one ordered pass
+    same_style = same_style.tolist()
+    merges_with_previous = merges_with_previous.tolist()
+    x0s, y0s, x1s, y1s, font_sizes = x0.tolist(), y0.tolist(), x1.tolist(), y1.tolist(), font_size.tolist()
+    is_short = is_short.tolist()
+    group_starts = [0]
+    for j in range(1, line_count):
+        start = group_starts[-1]
+        if not same_style[j-1]:
+            merged = False
+        elif start == j - 1:
+            merged = merges_with_previous[j-1]
+        else:
+            current_line_height = y1s[j-1] - y0s[start]
+            vertical_distance_j = y0s[j] - y1s[j-1]
+            merged = (vertical_distance_j < ((current_line_height + (y1s[j] - y0s[j])) / 2 * 2.5) and
+                      abs(font_sizes[j] - font_sizes[start]) < 2.0 and
+                      (max(0, min(x1s[start], x1s[j]) - max(x0s[start], x0s[j])) >
+                       min(x1s[start] - x0s[start], x1s[j] - x0s[j]) * 0.25 or
+                       (is_short[j] and
+                        vertical_distance_j < (current_line_height * 1.0) and
+                        abs(x0s[j] - x0s[start]) < 50)))
+        if not merged:
+            group_starts.append(j)
+    
+    starts = np.array(group_starts)
+    ends = np.append(starts[1:], line_count)
+    texts = table.text
+    merged_table = table.take(starts)
+    merged_table.text = [" ".join(texts[start:end]) if end - start > 1 else texts[start]
+                         for start, end in zip(group_starts, ends.tolist())]
+    merged_table.y1 = y1[ends - 1]
+    return merged_table
+
+def _boilerplate_keys(table, page_heights):
+    """Return a (normalized text, quantized y0) key per row for lines in the page margins, else None."""
+    heights = np.asarray(page_heights, dtype=np.float64)[table.page_number - 1]
+    in_margin = (table.y0 < heights * BOILERPLATE_MARGIN) | (table.y1 > heights * (1 - BOILERPLATE_MARGIN))
+    y_buckets = np.round(table.y0 / BOILERPLATE_Y_QUANTUM).astype(np.int64)
+    keys = [None] * len(table)
+    for i in np.flatnonzero(in_margin).tolist():
+        # Page numbers and dates differ from page to page only in their digits
+        text = re.sub(r"\d+", "#", " ".join(table.text[i].lower().split()))
+        if any(c.isalnum() or c == "#" for c in text):
+            keys[i] = (text, int(y_buckets[i]))
+    return keys
+
+def count_boilerplate_candidates(table, page_heights):
+    """Count the pages each margin line key appears on; counts over disjoint pages add up."""
+    keyed_pages = set(zip(_boilerplate_keys(table, page_heights), table.page_number.tolist()))
+    return Counter(key for key, _ in keyed_pages if key is not None)
+
+def find_boilerplate(candidate_counts, text_page_count):
+    """Return the keys recurring on enough pages to be running headers, footers or page numbers."""
+    min_pages = max(BOILERPLATE_MIN_PAGES, BOILERPLATE_PAGE_FRACTION * text_page_count)
+    return {key for key, count in candidate_counts.items() if count >= min_pages}
+
+def mark_boilerplate(table, page_heights):
+    """Mark the running headers and footers of a whole-document merged LineTable."""
+    boilerplate = find_boilerplate(count_boilerplate_candidates(table, page_heights), len(np.unique(table.page_number)))
+    return boilerplate_mask(table, boilerplate, page_heights)
+
+def boilerplate_mask(table, boilerplate, page_heights):
+    """Return a boolean array marking the rows of table whose key is in boilerplate."""
+    if not boilerplate:
+        return np.zeros(len(table), dtype=bool)
+    return np.array([key in boilerplate for key in _boilerplate_keys(table, page_heights)], dtype=bool)
+
+def build_line_index(lines_data):
+    """Map (text, page, y0) of every line to its row so a heading resolves to its source line in O(1)."""
+    if isinstance(lines_data, LineTable):
+        keys = zip((text.strip() for text in lines_data.text), lines_data.page_number.tolist(), lines_data.y0.tolist())
+    else:
+        keys = ((line["text"].strip(), line["page_number"], line["line_y0"]) for line in lines_data)
+    line_index = {}
+    for row, key in enumerate(keys):
+        line_index.setdefault(key, row)
+    return line_index
+
+def heading_line(heading, line_index):
+    """Return the row of the line a heading was detected on, or None if it is not in the index."""
+    # TOC headings keep the TOC title as text and record the line they resolved to separately
+    return line_index.get((heading.get("line_text", heading["text"]), heading["page"], heading["line_y0"]))
+
+def compute_font_statistics(lines_data):
+    """Collect the global and per-page font size statistics used for heading scoring."""
+    if isinstance(lines_data, LineTable):
+        positive = lines_data.font_size > 0
+        font_sizes = lines_data.font_size[positive]
+        pages, page_index = np.unique(lines_data.page_number[positive], return_inverse=True)
+        page_maxima = np.zeros(len(pages))
+        np.maximum.at(page_maxima, page_index, font_sizes)
+        return {
+            "min_font_size": float(font_sizes.min()) if len(font_sizes) else 0,
+            "max_font_size": float(font_sizes.max()) if len(font_sizes) else 0,
+            "page_max_font_size": dict(zip(pages.tolist(), page_maxima.tolist()))
+        }
+    
+    page_max_font_size = {}
+    for line in lines_data:
+        font_size = line["font_size"]
+        if font_size > 0 and font_size > page_max_font_size.get(line["page_number"], 0):
+            page_max_font_size[line["page_number"]] = font_size
+    all_font_sizes = [line["font_size"] for line in lines_data if line["font_size"] > 0]
+    return {
+        "min_font_size": min(all_font_sizes) if all_font_sizes else 0,
+        "max_font_size": max(all_font_sizes) if all_font_sizes else 0,
+        "page_max_font_size": page_max_font_size
+    }
+
+def reduce_font_statistics(statistics):
+    """Combine font statistics computed over disjoint page ranges into document-wide statistics."""
+    non_empty = [stats for stats in statistics if stats["page_max_font_size"]]
+    page_max_font_size = {}
+    for stats in non_empty:
+        page_max_font_size.update(stats["page_max_font_size"])
+    return {
+        "min_font_size": min((stats["min_font_size"] for stats in non_empty), default=0),
+        "max_font_size": max((stats["max_font_size"] for stats in non_empty), default=0),
+        "page_max_font_size": page_max_font_size
+    }
+
+def compute_heading_confidence(lines_data, document_title, font_statistics=None, excluded=None):
     """Compute confidence scores for potential headings based on font, spacing, and text patterns."""
+    # excluded marks lines (e.g. running headers) that still give spacing context to
+    # their neighbours but can never become a heading or the title
+    if font_statistics is None:
+        font_statistics = compute_font_statistics(lines_data)
+    if excluded is None:
+        excluded = np.zeros(len(lines_data), dtype=bool)
+    if isinstance(lines_data, LineTable):
+        return _score_line_table(lines_data, document_title, font_statistics, np.asarray(excluded, dtype=bool))
+    columns = ([line["text"] for line in lines_data], [line["font_size"] for line in lines_data],
+               [line["is_bold"] for line in lines_data], [line["page_number"] for line in lines_data],
+               [line["line_x0"] for line in lines_data], [line["line_y0"] for line in lines_data],
+               [line["line_y1"] for line in lines_data])
+    return _score_lines(*columns, document_title, font_statistics, list(excluded))
+
+def _score_line_table(table, document_title, font_statistics, excluded):
+    """Vectorized scoring of a LineTable; terms are accumulated in the same order as _score_lines."""
+    min_global_font_size = font_statistics["min_font_size"]
+    max_global_font_size = font_statistics["max_font_size"]
+    line_count = len(table)
+    if not line_count:
+        return [], document_title
+    
+    font_size = table.font_size
+    is_bold = table.is_bold
+    page_number = table.page_number
+    texts = [text.strip() for text in table.text]
+    word_counts = np.array([len(text.split()) for text in texts])
+    text_lengths = np.array([len(text) for text in texts])
+    heading_confidence = np.zeros(line_count)
+    
+    # Font size contribution
+    if max_global_font_size > min_global_font_size:
+        font_size_normalized = (font_size - min_global_font_size) / (max_global_font_size - min_global_font_size)
+        heading_confidence += np.where(font_size > 0, font_size_normalized * 0.35, np.where(font_size >= 11, 0.15, 0.0))
+    else:
+        heading_confidence += np.where(font_size >= 11, 0.15, 0.0)
+    
+    pages, page_index = np.unique(page_number, return_inverse=True)
+    page_max_font_size = font_statistics["page_max_font_size"]
+    max_page_font_size = np.array([page_max_font_size.get(page, np.nan) for page in pages.tolist()])[page_index]
+    heading_confidence += np.select([font_size >= max_page_font_size * 0.9, font_size >= max_page_font_size * 0.7],
+                                    [0.15, 0.05], 0.0)
+    
+    # Bold contribution
+    heading_confidence += np.where(is_bold, 0.3, 0.0)
+    
+    # Spacing contribution
+    line_height = table.y1 - table.y0
+    same_page_as_next = np.zeros(line_count, dtype=bool)
+    same_page_as_next[:-1] = page_number[1:] == page_number[:-1]
+    gap_to_next = np.zeros(line_count)
+    gap_to_next[:-1] = table.y0[1:] - table.y1[:-1]
+    space_to_next_line = np.where(same_page_as_next, gap_to_next, 0.0)
+    next_is_body_text = np.zeros(line_count, dtype=bool)
+    next_is_body_text[:-1] = (~is_bold[1:] &
+                              (font_size[1:] < font_size[:-1] * 0.9) &
+                              (font_size[1:] >= min_global_font_size * 0.9) &
+                              (word_counts[1:] > 4))
+    next_is_body_text &= same_page_as_next & (space_to_next_line >= 3)
+    heading_confidence += np.where(next_is_body_text, 0.4, 0.0)
+    heading_confidence += np.select([space_to_next_line > (line_height * 2.0),
+                                     space_to_next_line > (line_height * 1.5),
+                                     space_to_next_line > (line_height * 1.0)], [0.35, 0.2, 0.1], 0.0)
+    
+    same_page_as_previous = np.zeros(line_count, dtype=bool)
+    same_page_as_previous[1:] = same_page_as_next[:-1]
+    space_from_previous_line = np.zeros(line_count)
+    space_from_previous_line[1:] = gap_to_next[:-1]
+    heading_confidence += np.select([same_page_as_previous & (space_from_previous_line > (line_height * 1.5)),
+                                     same_page_as_previous & (space_from_previous_line > (line_height * 1.0))],
+                                    [0.1, 0.05], 0.0)
+    
+    # Positioning contribution
+    heading_confidence += np.where(table.x0 < 100, 0.1, 0.0)
+    
+    # Text pattern contribution; string features are only evaluated for lines that can
+    # still clear the threshold (or become the title), as they add at most 0.4
+    candidates = heading_confidence + (0.1 + 0.15 + 0.15) + 1e-9 > 0.70
+    if document_title == "Untitled Document":
+        candidates |= (page_number == 1) & (font_size >= (max_global_font_size * 0.8))
+    candidates &= ~excluded
+    is_upper = np.zeros(line_count, dtype=bool)
+    is_numbered = np.zeros(line_count, dtype=bool)
+    has_keyword = np.zeros(line_count, dtype=bool)
+    is_rule = np.zeros(line_count, dtype=bool)
+    for i in np.flatnonzero(candidates).tolist():
+        match = HEADING_PATTERN.match(texts[i])
+        is_upper[i] = texts[i].isupper()
+        is_numbered[i] = match.group("numbered") is not None
+        has_keyword[i] = match.group("keyword") is not None
+        is_rule[i] = match.group("rule") is not None
+    heading_confidence += np.where(is_upper & (word_counts > 1) & (text_lengths > 3), 0.1, 0.0)
+    heading_confidence += np.where(is_numbered, 0.15, 0.0)
+    heading_confidence += np.where(has_keyword, 0.15, 0.0)
+    
+    # Penalties
+    heading_confidence *= np.where(word_counts > 15, 0.7, 1.0)
+    heading_confidence *= np.where(text_lengths < 3, 0.5, 1.0)
+    heading_confidence *= np.where(font_size < 8, 0.1, 1.0)
+    heading_confidence *= np.where(excluded, 0.0, 1.0)
+    if document_title == "Untitled Document":
+        title_candidates = np.flatnonzero((page_number == 1) & (font_size >= (max_global_font_size * 0.8)) &
+                                          (heading_confidence > 0.4))
+        if len(title_candidates):
+            document_title = texts[title_candidates[0]]
+            heading_confidence[title_candidates[0]] = 1.0
+    heading_confidence *= np.where(is_rule, 0.05, 1.0)
+    for i in np.flatnonzero((heading_confidence > 0.70) & (text_lengths > 10)).tolist():
+        if sum(c.isalnum() for c in texts[i]) < 5:
+            heading_confidence[i] *= 0.1
+    
     potential_headings = []
-    all_font_sizes = [line["font_size"] for line in lines_data if line["font_size"] > 0]
-    min_global_font_size = min(all_font_sizes) if all_font_sizes else 0
-    max_global_font_size = max(all_font_sizes) if all_font_sizes else 0
-    page_font_sizes = defaultdict(list)
-    for line in lines_data:
-        if line["font_size"] > 0:
-            page_font_sizes[line["page_number"]].append(line["font_size"])
+    for i in np.flatnonzero(heading_confidence > 0.70).tolist():
+        potential_headings.append({
+            "text": texts[i],
+            "font_size": float(font_size[i]),
+            "page": int(page_number[i]),
+            "is_bold": bool(is_bold[i]),
+            "x0": float(table.x0[i]),
+            "line_y0": float(table.y0[i]),
+            "line_y1": float(table.y1[i]),
+            "line_height": float(line_height[i]),
+            "space_after": float(space_to_next_line[i]),
+            "heading_confidence": float(heading_confidence[i])
+        })
+    
+    return potential_headings, document_title
+
+def _score_lines(texts, font_sizes, bold_flags, page_numbers, x0s, y0s, y1s, document_title, font_statistics, excluded):
+    """Score every line given as parallel column lists; see compute_heading_confidence."""
+    potential_headings = []
+    min_global_font_size = font_statistics["min_font_size"]
+    max_global_font_size = font_statistics["max_font_size"]
+    page_max_font_size = font_statistics["page_max_font_size"]
+    line_count = len(texts)
     
-    for i, line in enumerate(lines_data):
+    for i in range(line_count):
         heading_confidence = 0.0
-        font_size = line["font_size"]
-        is_bold = line["is_bold"]
-        page_num = line["page_number"]
-        text = line["text"].strip()
+        font_size = font_sizes[i]
+        is_bold = bold_flags[i]
+        page_num = page_numbers[i]
+        text = texts[i].strip()
         
         # Font size contribution
         if font_size > 0 and max_global_font_size > min_global_font_size:
@@ -62,8 +369,8 @@ def compute_heading_confidence(lines_data, document_title):
         elif font_size >= 11:
             heading_confidence += 0.15
         
-        if page_font_sizes[page_num]:
-            max_page_font_size = max(page_font_sizes[page_num])
+        if page_num in page_max_font_size:
+            max_page_font_size = page_max_font_size[page_num]
             if font_size >= max_page_font_size * 0.9:
                 heading_confidence += 0.15
             elif font_size >= max_page_font_size * 0.7:
@@ -74,16 +381,15 @@ def compute_heading_confidence(lines_data, document_title):
             heading_confidence += 0.3
         
         # Spacing contribution
-        line_height = line["line_y1"] - line["line_y0"]
+        line_height = y1s[i] - y0s[i]
         space_to_next_line = 0
         next_is_body_text = False
-        if i + 1 < len(lines_data) and lines_data[i+1]["page_number"] == page_num:
-            next_line = lines_data[i+1]
-            space_to_next_line = next_line["line_y0"] - line["line_y1"]
-            if (not next_line["is_bold"] and
-                next_line["font_size"] < font_size * 0.9 and
-                next_line["font_size"] >= min_global_font_size * 0.9 and
-                len(next_line["text"].split()) > 4 and
+        if i + 1 < line_count and page_numbers[i+1] == page_num:
+            space_to_next_line = y0s[i+1] - y1s[i]
+            if (not bold_flags[i+1] and
+                font_sizes[i+1] < font_size * 0.9 and
+                font_sizes[i+1] >= min_global_font_size * 0.9 and
+                len(texts[i+1].split()) > 4 and
                 space_to_next_line >= 3):
                 next_is_body_text = True
                 heading_confidence += 0.4
@@ -95,15 +401,15 @@ def compute_heading_confidence(lines_data, document_title):
         elif space_to_next_line > (line_height * 1.0):
             heading_confidence += 0.1
         
-        if i > 0 and lines_data[i-1]["page_number"] == page_num:
-            space_from_previous_line = line["line_y0"] - lines_data[i-1]["line_y1"]
+        if i > 0 and page_numbers[i-1] == page_num:
+            space_from_previous_line = y0s[i] - y1s[i-1]
             if space_from_previous_line > (line_height * 1.5):
                 heading_confidence += 0.1
             elif space_from_previous_line > (line_height * 1.0):
                 heading_confidence += 0.05
         
         # Positioning contribution
-        if line["line_x0"] < 100:
+        if x0s[i] < 100:
             heading_confidence += 0.1
         
         # Text pattern contribution
@@ -121,6 +427,8 @@ def compute_heading_confidence(lines_data, document_title):
             heading_confidence *= 0.5
         if font_size < 8:
             heading_confidence *= 0.1
+        if excluded[i]:
+            heading_confidence = 0.0
         if document_title == "Untitled Document" and page_num == 1 and font_size >= (max_global_font_size * 0.8) and heading_confidence > 0.4:
             document_title = text
             heading_confidence = 1.0
@@ -135,7 +443,9 @@ def compute_heading_confidence(lines_data, document_title):
                 "font_size": font_size,
                 "page": page_num,
                 "is_bold": is_bold,
-                "x0": line["bbox"][0],
+                "x0": x0s[i],
+                "line_y0": y0s[i],
+                "line_y1": y1s[i],
                 "line_height": line_height,
                 "space_after": space_to_next_line,
                 "heading_confidence": heading_confidence
@@ -143,10 +453,16 @@ def compute_heading_confidence(lines_data, document_title):
     
     return potential_headings, document_title
 
-def assign_heading_levels(potential_headings):
-    """Assign heading levels (H1, H2, H3) based on font size clusters."""
+def assign_heading_levels(potential_headings, heading_font_sizes=None):
+    """Assign heading levels (H1, H2, H3) based on font size clusters.
+
+    Clusters are built from heading_font_sizes when given (e.g. every heading size of a whole
+    document, to level one page's headings alone), otherwise from the headings' own sizes.
+    """
     potential_headings.sort(key=lambda x: (x["heading_confidence"], x["font_size"]), reverse=True)
-    unique_heading_font_sizes = sorted(list(set(h["font_size"] for h in potential_headings)), reverse=True)
+    if heading_font_sizes is None:
+        heading_font_sizes = set(h["font_size"] for h in potential_headings)
+    unique_heading_font_sizes = sorted(list(heading_font_sizes), reverse=True)
     
     font_size_clusters = []
     if unique_heading_font_sizes:
@@ -194,9 +510,14 @@ def assign_heading_levels(potential_headings):
                 "level": assigned_level,
                 "text": heading["text"],
                 "page": heading["page"],
-                "heading_confidence": heading["heading_confidence"]
+                "heading_confidence": heading["heading_confidence"],
+                "line_y0": heading["line_y0"]
             })
     
+    return order_outline(final_headings)
+
+def order_outline(final_headings):
+    """Sort outline entries by page, level and text, dropping duplicate (level, text, page) entries."""
     final_headings.sort(key=lambda x: (x["page"], 
                                       0 if x["level"] == "H1" else 
                                       1 if x["level"] == "H2" else 
@@ -211,4 +532,99 @@ def assign_heading_levels(potential_headings):
             unique_final_headings.append(heading)
             seen_keys.add(key)
     
-    return unique_final_headings
\ No newline at end of file
+    return unique_final_headings
+
+def toc_covered_pages(toc_entries, page_count):
+    """Return the sorted page numbers an embedded TOC covers, or None if it is too sparse to trust."""
+    if len(toc_entries) < MIN_TOC_ENTRIES:
+        return None
+    entry_pages = sorted({entry["page"] for entry in toc_entries})
+    covered_pages = []
+    for page, next_page in zip(entry_pages, entry_pages[1:] + [page_count + 1]):
+        covered_pages.extend(range(page, min(next_page, page + MAX_TOC_PAGE_GAP)))
+    return covered_pages
+
+def _normalize_title(text):
+    """Lowercase and collapse whitespace for comparing TOC titles with line text."""
+    return " ".join(text.lower().split())
+
+def _resolve_toc_entry(entry, lines, page_start, page_stop):
+    """Return the row of the merged line a TOC entry points at, or None if it cannot be placed."""
+    title = _normalize_title(entry["title"])
+    matches = []
+    for row in range(page_start, page_stop):
+        text = _normalize_title(lines.text[row])
+        # The line may carry more text than the title (merged lines) or be a truncated title
+        if text.startswith(title) or (title.startswith(text) and len(text) * 2 >= len(title)):
+            matches.append(row)
+    if matches:
+        if entry["y"] is None:
+            return matches[0]
+        return min(matches, key=lambda row: abs(lines.y0[row] - entry["y"]))
+    if entry["y"] is not None:
+        # The destination point sits at or just above the top of the target line
+        below = np.flatnonzero(lines.y1[page_start:page_stop] > entry["y"])
+        if len(below):
+            return page_start + int(below[0])
+    return None
+
+def detect_headings_with_toc(lines, toc_entries, document_title, page_count, excluded=None):
+    """Build the outline of a merged LineTable from a trusted TOC, scoring only the pages it does not cover."""
+    if excluded is None:
+        excluded = np.zeros(len(lines), dtype=bool)
+    covered_pages = toc_covered_pages(toc_entries, page_count)
+    if covered_pages is None:
+        potential_headings, updated_title = compute_heading_confidence(lines, document_title, excluded=excluded)
+        return updated_title, assign_heading_levels(potential_headings)
+    
+    # Pages the TOC does not cover (cover, front matter, long gaps between entries) still go
+    # through the heuristics, normalized with the font statistics of the whole document as in the full path
+    uncovered = ~np.isin(lines.page_number, covered_pages)
+    potential_headings, updated_title = compute_heading_confidence(lines.take(uncovered), document_title,
+                                                                   compute_font_statistics(lines), excluded[uncovered])
+    final_headings = assign_heading_levels(potential_headings)
+    
+    # Entries are placed among the content lines only, never on a running header
+    lines = lines.take(~excluded)
+    for entry in toc_entries:
+        page_start, page_stop = np.searchsorted(lines.page_number, [entry["page"], entry["page"] + 1])
+        row = _resolve_toc_entry(entry, lines, int(page_start), int(page_stop))
+        heading = {
+            "level": f"H{min(entry['level'], 3)}",
+            "text": entry["title"],
+            "page": entry["page"],
+            "heading_confidence": 1.0,
+            "line_y0": float(lines.y0[row]) if row is not None else None
+        }
+        if row is not None and lines.text[row].strip() != entry["title"]:
+            heading["line_text"] = lines.text[row].strip()
+        final_headings.append(heading)
+    return updated_title, order_outline(final_headings)
+
+def detect_headings_streaming(page_tables, document_title, page_heights):
+    """Detect headings from per-page LineTables in two passes, holding one page of lines at a time."""
+    # page_tables is called once per pass and must return a fresh iterable of tables.
+    # Pass 1: only per-page font statistics and running header/footer counts survive;
+    # lines are never merged across pages
+    page_statistics = []
+    candidate_counts = Counter()
+    text_page_count = 0
+    for table in page_tables():
+        merged_lines = merge_lines(table)
+        page_statistics.append(compute_font_statistics(merged_lines))
+        candidate_counts.update(count_boilerplate_candidates(merged_lines, page_heights))
+        text_page_count += 1 if len(merged_lines) else 0
+    font_statistics = reduce_font_statistics(page_statistics)
+    boilerplate = find_boilerplate(candidate_counts, text_page_count)
+    
+    # Pass 2: score each page against the document-wide statistics; only page 1 can set the title
+    potential_headings = []
+    updated_title = document_title
+    for table in page_tables():
+        merged_lines = merge_lines(table)
+        headings, page_title = compute_heading_confidence(merged_lines, document_title, font_statistics,
+                                                          boilerplate_mask(merged_lines, boilerplate, page_heights))
+        potential_headings.extend(headings)
+        if page_title != document_title:
+            updated_title = page_title
+    return updated_title, assign_heading_levels(potential_headings), boilerplate
@@ -0,0 +1,132 @@
+from collections import Counter
+from pdf_processor import get_document_title, get_page_heights, iter_page_tables, DEFAULT_PROFILE
+from heading_detector import (merge_lines, compute_font_statistics, count_boilerplate_candidates, find_boilerplate,
+                              boilerplate_mask, compute_heading_confidence, assign_heading_levels)
+
+# Pages read past the page being scored, so its font sizes are normalized with some context
+DEFAULT_LOOKAHEAD = 8
+
+LEVEL_ORDER = {"H1": 0, "H2": 1, "H3": 2}
+
+def _outline_keys(outline):
+    """Key outline entries by (page, text, occurrence) so a level change is an update, not a new heading."""
+    keyed = {}
+    occurrences = {}
+    for heading in outline:
+        occurrence = occurrences.get((heading["page"], heading["text"]), 0)
+        occurrences[(heading["page"], heading["text"])] = occurrence + 1
+        keyed[(heading["page"], heading["text"], occurrence)] = heading
+    return keyed
+
+def _diff_outline(previous, current):
+    """Return the add/update/remove events that turn the previous keyed outline into the current one."""
+    events = []
+    for key, heading in previous.items():
+        if key not in current:
+            events.append({"event": "remove", "key": key, "heading": heading})
+    for key, heading in current.items():
+        if key not in previous:
+            events.append({"event": "add", "key": key, "heading": heading})
+        elif previous[key] != heading:
+            events.append({"event": "update", "key": key, "heading": heading})
+    return events
+
+def _add_font_statistics(font_statistics, page_statistics):
+    """Fold one page's font statistics into the running document-wide statistics in place."""
+    if not page_statistics["page_max_font_size"]:
+        return
+    if font_statistics["page_max_font_size"]:
+        font_statistics["min_font_size"] = min(font_statistics["min_font_size"], page_statistics["min_font_size"])
+        font_statistics["max_font_size"] = max(font_statistics["max_font_size"], page_statistics["max_font_size"])
+    else:
+        font_statistics["min_font_size"] = page_statistics["min_font_size"]
+        font_statistics["max_font_size"] = page_statistics["max_font_size"]
+    font_statistics["page_max_font_size"].update(page_statistics["page_max_font_size"])
+
+def iter_outline_events(document, lookahead=DEFAULT_LOOKAHEAD, profile=DEFAULT_PROFILE):
+    """Yield provisional outline events page by page; replayed in full they give the batch outline."""
+    document_title = get_document_title(document)
+    title = emitted_title = document_title
+    yield {"event": "title", "title": title}
+
+    page_heights = get_page_heights(document)
+    pages = iter_page_tables(document, profile=profile)
+    merged_pages = []
+    page_headings = []
+    font_statistics = {"min_font_size": 0, "max_font_size": 0, "page_max_font_size": {}}
+    candidate_counts = Counter()
+    text_page_count = 0
+    boilerplate = set()
+    scored_range = None
+    heading_font_sizes = set()
+    emitted = {}
+    exhausted = False
+
+    while True:
+        # Keep up to lookahead pages read beyond the next page to score
+        while not exhausted and len(merged_pages) <= len(page_headings) + lookahead:
+            table = next(pages, None)
+            if table is None:
+                exhausted = True
+                break
+            merged_lines = merge_lines(table)
+            merged_pages.append(merged_lines)
+            _add_font_statistics(font_statistics, compute_font_statistics(merged_lines))
+            candidate_counts.update(count_boilerplate_candidates(merged_lines, page_heights))
+            text_page_count += 1 if len(merged_lines) else 0
+        if len(page_headings) == len(merged_pages):
+            break
+
+        # Scores depend on the document-wide font range, the page's own maximum and the
+        # running headers seen so far, so scored pages are revisited only when those change
+        font_range = (font_statistics["min_font_size"], font_statistics["max_font_size"])
+        current_boilerplate = find_boilerplate(candidate_counts, text_page_count)
+        rescore = font_range != scored_range or current_boilerplate != boilerplate
+        if rescore:
+            scored_range = font_range
+            boilerplate = current_boilerplate
+            rescored = [compute_heading_confidence(merged_lines, document_title, font_statistics,
+                                                   boilerplate_mask(merged_lines, boilerplate, page_heights))
+                        for merged_lines in merged_pages[:len(page_headings)]]
+            page_headings = [headings for headings, _ in rescored]
+            if rescored:
+                title = rescored[0][1]
+        merged_lines = merged_pages[len(page_headings)]
+        headings, page_title = compute_heading_confidence(merged_lines, document_title, font_statistics,
+                                                          boilerplate_mask(merged_lines, boilerplate, page_heights))
+        if not page_headings:
+            title = page_title
+        page_headings.append(headings)
+
+        if title != emitted_title:
+            emitted_title = title
+            yield {"event": "title", "title": title}
+        # Levels depend only on the distinct heading font sizes seen so far. While those and the
+        # earlier pages' scores are unchanged, only the new page's headings are levelled and added;
+        # otherwise every heading is re-clustered and changes surface as corrections
+        if rescore or not {heading["font_size"] for heading in headings} <= heading_font_sizes:
+            all_headings = [heading for headings in page_headings for heading in headings]
+            heading_font_sizes = {heading["font_size"] for heading in all_headings}
+            current = _outline_keys(assign_heading_levels(all_headings))
+            for event in _diff_outline(emitted, current):
+                yield event
+            emitted = current
+        else:
+            for key, heading in _outline_keys(assign_heading_levels(list(headings), heading_font_sizes)).items():
+                yield {"event": "add", "key": key, "heading": heading}
+                emitted[key] = heading
+        yield {"event": "page", "page": len(page_headings)}
+
+def replay_outline_events(events):
+    """Apply outline events in order and return the resulting (title, outline)."""
+    title = None
+    outline = {}
+    for event in events:
+        if event["event"] == "title":
+            title = event["title"]
+        elif event["event"] == "remove":
+            del outline[event["key"]]
+        elif event["event"] in ("add", "update"):
+            outline[event["key"]] = event["heading"]
+    headings = sorted(outline.values(), key=lambda x: (x["page"], LEVEL_ORDER.get(x["level"], 3), x["text"]))
+    return title, headings
@@ -0,0 +1,132 @@
+import numpy as np
+
+class LineTable:
+    """Column-oriented store of text lines: parallel NumPy arrays plus one list of strings."""
+
+    def __init__(self, text, font_size, x0, y0, x1, y1, page_number, is_bold):
+        self.text = list(text)
+        self.font_size = np.asarray(font_size, dtype=np.float64)
+        self.x0 = np.asarray(x0, dtype=np.float64)
+        self.y0 = np.asarray(y0, dtype=np.float64)
+        self.x1 = np.asarray(x1, dtype=np.float64)
+        self.y1 = np.asarray(y1, dtype=np.float64)
+        self.page_number = np.asarray(page_number, dtype=np.int32)
+        self.is_bold = np.asarray(is_bold, dtype=bool)
+
+    def __len__(self):
+        return len(self.text)
+
+    @classmethod
+    def empty(cls):
+        """Return a table with no lines."""
+        return cls([], [], [], [], [], [], [], [])
+
+    @classmethod
+    def from_records(cls, lines):
+        """Build a table from line dicts as produced by pdf_processor.extract_text_blocks."""
+        return cls(
+            [line["text"] for line in lines],
+            [line["font_size"] for line in lines],
+            [line["bbox"][0] for line in lines],
+            [line["bbox"][1] for line in lines],
+            [line["bbox"][2] for line in lines],
+            [line["bbox"][3] for line in lines],
+            [line["page_number"] for line in lines],
+            [line["is_bold"] for line in lines]
+        )
+
+    @classmethod
+    def concat(cls, tables):
+        """Concatenate tables in order."""
+        tables = list(tables)
+        if not tables:
+            return cls.empty()
+        return cls(
+            [text for table in tables for text in table.text],
+            np.concatenate([table.font_size for table in tables]),
+            np.concatenate([table.x0 for table in tables]),
+            np.concatenate([table.y0 for table in tables]),
+            np.concatenate([table.x1 for table in tables]),
+            np.concatenate([table.y1 for table in tables]),
+            np.concatenate([table.page_number for table in tables]),
+            np.concatenate([table.is_bold for table in tables])
+        )
+
+    def take(self, indices):
+        """Return a new table with the rows selected by an index array or boolean mask."""
+        indices = np.asarray(indices)
+        if indices.dtype == bool:
+            indices = np.flatnonzero(indices)
+        return LineTable(
+            [self.text[i] for i in indices.tolist()],
+            self.font_size[indices],
+            self.x0[indices],
+            self.y0[indices],
+            self.x1[indices],
+            self.y1[indices],
+            self.page_number[indices],
+            self.is_bold[indices]
+        )
+
+    def record(self, i):
+        """Return row i as a line dict."""
+        bbox = [float(self.x0[i]), float(self.y0[i]), float(self.x1[i]), float(self.y1[i])]
+        return {
+            "text": self.text[i],
+            "font_size": float(self.font_size[i]),
+            "bbox": bbox,
+            "page_number": int(self.page_number[i]),
+            "is_bold": bool(self.is_bold[i]),
+            "line_y0": bbox[1],
+            "line_x0": bbox[0],
+            "line_y1": bbox[3]
+        }
+
+    def to_records(self):
+        """Return all rows as line dicts."""
+        records = []
+        for text, font_size, x0, y0, x1, y1, page_number, is_bold in zip(
+                self.text, self.font_size.tolist(), self.x0.tolist(), self.y0.tolist(), self.x1.tolist(),
+                self.y1.tolist(), self.page_number.tolist(), self.is_bold.tolist()):
+            records.append({
+                "text": text,
+                "font_size": font_size,
+                "bbox": [x0, y0, x1, y1],
+                "page_number": page_number,
+                "is_bold": is_bold,
+                "line_y0": y0,
+                "line_x0": x0,
+                "line_y1": y1
+            })
+        return records
+
+    def to_arrays(self):
+        """Pack the table into flat arrays with the text stored as a UTF-8 buffer plus offsets."""
+        encoded = [text.encode("utf-8") for text in self.text]
+        text_offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(text) for text in encoded], out=text_offsets[1:])
+        return {
+            "text_data": np.frombuffer(b"".join(encoded), dtype=np.uint8),
+            "text_offsets": text_offsets,
+            "font_size": self.font_size,
+            "bbox": np.stack([self.x0, self.y0, self.x1, self.y1], axis=1),
+            "page_number": self.page_number,
+            "is_bold": self.is_bold
+        }
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        """Rebuild a table from the arrays written by to_arrays."""
+        text_data = arrays["text_data"].tobytes()
+        offsets = arrays["text_offsets"].tolist()
+        bbox = np.asarray(arrays["bbox"], dtype=np.float64).reshape(-1, 4)
+        return cls(
+            [text_data[offsets[i]:offsets[i + 1]].decode("utf-8") for i in range(len(offsets) - 1)],
+            arrays["font_size"],
+            bbox[:, 0],
+            bbox[:, 1],
+            bbox[:, 2],
+            bbox[:, 3],
+            arrays["page_number"],
+            arrays["is_bold"]
+        )
@@ -1,81 +1,261 @@
 import os
 import json
-from datetime import datetime
-from pdf_processor import load_pdf, get_document_title, extract_text_blocks, close_document
-from heading_detector import merge_lines, compute_heading_confidence, assign_heading_levels
-from output_handler import save_outline_to_json
-from semantic_analyzer import extract_keywords, extract_sections_and_subsections
-from sentence_transformers import SentenceTransformer
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from collections import defaultdict
+from itertools import repeat
+from pdf_processor import (EXTRACTOR_VERSION, load_pdf, get_document_title, get_page_heights, get_toc_entries, extract_line_table,
+                           iter_page_tables, close_document, group_near_duplicates, is_extraction_cached)
+from heading_detector import (merge_lines, mark_boilerplate, boilerplate_mask, compute_heading_confidence,
+                              assign_heading_levels, detect_headings_streaming, detect_headings_with_toc)
+from output_handler import (save_outline_to_json, save_sections_to_json, load_sections_from_json, load_queries,
+                            build_output)
+from manifest import load_manifest, save_manifest, make_entry, is_unchanged, remove_outputs
+from page_parallel import detect_headings_parallel
+from semantic_analyzer import (DEFAULT_BATCH_SIZE, DEFAULT_MODEL_NAME, load_model, collect_sections_and_subsections,
+                               rank_sections_for_queries)
+from embedding_cache import DEFAULT_MAX_ENTRIES, EmbeddingCache
+from extraction_cache import ExtractionCache, PageStore
+from embedding_daemon import DaemonModel
 
+MANIFEST_NAME = "main"
 
-def process_pdf(pdf_path, output_dir, job_description, model):
-    """Process a single PDF to extract and rank sections/subsections."""
-    document = load_pdf(pdf_path)
-    title = get_document_title(document)
-    text_blocks = extract_text_blocks(document)
-    merged_lines = merge_lines(text_blocks)
-    potential_headings, updated_title = compute_heading_confidence(merged_lines, title)
-    final_headings = assign_heading_levels(potential_headings)
 
-    # Add line_y0 for section extraction
-    for heading, line in zip(final_headings, merged_lines):
-        if heading["text"] == line["text"] and heading["page"] == line["page_number"]:
-            heading["line_y0"] = line["line_y0"]
+def collect_sections_streaming(pdf_path, outline, document, boilerplate, page_heights):
+    """Collect section texts page by page, re-reading only the pages that carry headings."""
+    outline_by_page = defaultdict(list)
+    for heading in outline:
+        outline_by_page[heading["page"]].append(heading)
+    page_numbers = sorted(outline_by_page)
+    
+    sections = []
+    subsections = []
+    for page_number, table in zip(page_numbers, iter_page_tables(document, [page - 1 for page in page_numbers])):
+        merged_lines = merge_lines(table)
+        merged_lines = merged_lines.take(~boilerplate_mask(merged_lines, boilerplate, page_heights))
+        page_sections, page_subsections = collect_sections_and_subsections(pdf_path, outline_by_page[page_number],
+                                                                           merged_lines)
+        sections.extend(page_sections)
+        subsections.extend(page_subsections)
+    return sections, subsections
 
-    sections, subsections = extract_sections_and_subsections(pdf_path, final_headings, document, job_description, model)
-    close_document(document)
 
-    # Save Round 1A output for reference
-    output_json_filename = os.path.splitext(os.path.basename(pdf_path))[0] + ".json"
-    save_outline_to_json(updated_title, final_headings, os.path.join(output_dir, output_json_filename))
+def parse_pdf(pdf_path, extraction_cache_dir=None, page_workers=1, stream=False, use_toc=False, page_store=None,
+              track_versions=True):
+    """Run the PDF parsing stages for one document; safe to call from a worker process.
 
-    return os.path.basename(pdf_path), sections, subsections
+    track_versions=False keeps the extraction cache from remembering pdf_path for reuse by a
+    later version of the file; use it for files at paths that are never seen again.
+    """
+    extraction_cache = ExtractionCache(extraction_cache_dir) if extraction_cache_dir else None
+    reused_before = page_store.hits if page_store is not None else 0
+    print(f"Processing {pdf_path}...")
+    if stream:
+        # Bounded memory: pages are extracted, merged and scored one at a time
+        document = load_pdf(pdf_path)
+        title = get_document_title(document)
+        page_heights = get_page_heights(document)
+        updated_title, final_headings, boilerplate = detect_headings_streaming(lambda: iter_page_tables(document), title,
+                                                                               page_heights)
+        sections, subsections = collect_sections_streaming(pdf_path, final_headings, document, boilerplate,
+                                                           page_heights)
+        close_document(document)
+    else:
+        if use_toc:
+            # Trust a complete embedded TOC and score only the pages it does not cover
+            document = load_pdf(pdf_path)
+            title = get_document_title(document)
+            merged_lines = merge_lines(extract_line_table(document, extraction_cache, page_store=page_store,
+                                                          track_versions=track_versions))
+            boilerplate = mark_boilerplate(merged_lines, get_page_heights(document))
+            updated_title, final_headings = detect_headings_with_toc(merged_lines, get_toc_entries(document), title,
+                                                                     document.page_count, boilerplate)
+            merged_lines = merged_lines.take(~boilerplate)
+            close_document(document)
+        elif page_workers > 1:
+            # Split a single large document into page ranges instead
+            updated_title, final_headings, merged_lines = detect_headings_parallel(pdf_path, page_workers)
+        else:
+            document = load_pdf(pdf_path)
+            title = get_document_title(document)
+            text_blocks = extract_line_table(document, extraction_cache, page_store=page_store,
+                                             track_versions=track_versions)
+            merged_lines = merge_lines(text_blocks)
+            # Running headers and footers stay as spacing context but never become headings or section text
+            boilerplate = mark_boilerplate(merged_lines, get_page_heights(document))
+            potential_headings, updated_title = compute_heading_confidence(merged_lines, title, excluded=boilerplate)
+            final_headings = assign_heading_levels(potential_headings)
+            merged_lines = merged_lines.take(~boilerplate)
+            close_document(document)
+        
+        # Headings carry the position of their source line, which bounds each section
+        sections, subsections = collect_sections_and_subsections(pdf_path, final_headings, merged_lines)
 
+    return {
+        "pdf_path": pdf_path,
+        "title": updated_title,
+        "outline": final_headings,
+        "sections": sections,
+        "subsections": subsections,
+        "extraction_cache_hit": extraction_cache is not None and extraction_cache.hits > 0,
+        "extraction_pages_reused": extraction_cache.pages_reused if extraction_cache is not None else 0,
+        "reused_pages": page_store.hits - reused_before if page_store is not None else 0
+    }
+
+
+def parse_pdf_group(pdf_paths, extraction_cache_dir=None, stream=False, use_toc=False):
+    """Parse a group of near-duplicate PDFs in order, sharing identical pages between them."""
+    # Streaming keeps memory bounded, so it never holds on to pages of earlier documents
+    page_store = PageStore() if len(pdf_paths) > 1 and not stream else None
+    return [parse_pdf(pdf_path, extraction_cache_dir, 1, stream, use_toc, page_store) for pdf_path in pdf_paths]
+
+
+def parse_pdfs(pdf_paths, extraction_cache_dir=None, workers=1, stream=False, use_toc=False):
+    """Parse PDFs serially or across a process pool, returning results in input order."""
+    if workers > 1 and len(pdf_paths) == 1 and not stream and not use_toc:
+        return [parse_pdf(pdf_paths[0], extraction_cache_dir, page_workers=workers)]
+    
+    # Near-duplicate documents are parsed by the same worker so their shared pages are extracted once
+    groups = [[pdf_path] for pdf_path in pdf_paths]
+    if not stream:
+        # Files already in the extraction cache are never extracted, so they are not opened to be grouped
+        extraction_cache = ExtractionCache(extraction_cache_dir) if extraction_cache_dir else None
+        cached = [pdf_path for pdf_path in pdf_paths
+                  if extraction_cache is not None and is_extraction_cached(pdf_path, extraction_cache)]
+        groups = group_near_duplicates([pdf_path for pdf_path in pdf_paths if pdf_path not in cached])
+        groups += [[pdf_path] for pdf_path in cached]
+    if workers <= 1 or len(groups) <= 1:
+        grouped_results = [parse_pdf_group(group, extraction_cache_dir, stream, use_toc) for group in groups]
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers, len(groups))) as executor:
+            grouped_results = list(executor.map(parse_pdf_group, groups, repeat(extraction_cache_dir), repeat(stream),
+                                                repeat(use_toc)))
+    results_by_path = {result["pdf_path"]: result for results in grouped_results for result in results}
+    return [results_by_path[pdf_path] for pdf_path in pdf_paths]
+
+
+def parse_args(argv=None):
+    """Parse command-line options."""
+    parser = argparse.ArgumentParser(description="Generate Round 1B output for all PDFs in the input directory.")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE,
+                        help="Number of texts per embedding batch")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Number of processes used to parse PDFs in parallel")
+    parser.add_argument("--cache-dir", default=None,
+                        help="Directory for persistent caches (default: <output_dir>/.cache)")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="Disable the on-disk embedding and extraction caches")
+    parser.add_argument("--embedding-cache-size", type=int, default=DEFAULT_MAX_ENTRIES,
+                        help="Maximum number of cached embeddings before LRU eviction")
+    parser.add_argument("--stream", action="store_true",
+                        help="Extract and score one page at a time to keep memory flat on very large PDFs")
+    parser.add_argument("--use-toc", action="store_true",
+                        help="Take headings from a sufficiently complete embedded TOC instead of scoring every line")
+    parser.add_argument("--force", action="store_true",
+                        help="Reparse every PDF even if the output manifest shows it is unchanged")
+    return parser.parse_args(argv)
 
-def main():
+
+def main(argv=None):
     """Process all PDFs in the input directory and generate Round 1B output."""
+    args = parse_args(argv)
     input_dir = "/app/input"
     output_dir = "/app/output"
     os.makedirs(output_dir, exist_ok=True)
+    cache_dir = args.cache_dir or os.path.join(output_dir, ".cache")
 
-    # Load persona and job-to-be-done from config.json
+    # Load persona and job-to-be-done pairs from config.json
     config_path = os.path.join(input_dir, "config.json")
     with open(config_path, 'r', encoding='utf-8') as f:
         config = json.load(f)
-    persona = config["persona"]
-    job = config["job_to_be_done"]
-
-    # Load lightweight model
-    model = SentenceTransformer("all-MiniLM-L6-v2")
-
-    # Process all PDFs
-    output = {
-        "metadata": {
-            "input_documents": [],
-            "persona": persona,
-            "job_to_be_done": job,
-            "processing_timestamp": datetime.utcnow().isoformat() + "Z"
-        },
-        "extracted_sections": [],
-        "sub_section_analysis": []
-    }
+    queries = load_queries(config)
+
+    # The manifest records what each input produced; unchanged inputs are not parsed again
+    filenames = [filename for filename in sorted(os.listdir(input_dir)) if filename.endswith(".pdf")]
+    manifest_settings = {"extractor_version": EXTRACTOR_VERSION, "use_toc": args.use_toc}
+    previous_entries = {} if args.force else load_manifest(output_dir, MANIFEST_NAME, manifest_settings)
+    entries = {}
+    for filename, entry in previous_entries.items():
+        if filename not in filenames:
+            print(f"Removing outputs of deleted input {filename}")
+            remove_outputs(output_dir, entry)
+    changed_paths = []
+    for filename in filenames:
+        if is_unchanged(previous_entries.get(filename), os.path.join(input_dir, filename), output_dir):
+            entries[filename] = previous_entries[filename]
+        else:
+            changed_paths.append(os.path.join(input_dir, filename))
+    print(f"Manifest: {len(changed_paths)} of {len(filenames)} PDFs changed")
+
+    # Parse the changed PDFs; file order is fixed so output does not depend on completion order
+    extraction_cache_dir = None if args.no_cache else os.path.join(cache_dir, "extraction")
+    results = parse_pdfs(changed_paths, extraction_cache_dir, args.workers, args.stream, args.use_toc)
+    for result in results:
+        # Save Round 1A output for reference, and the sections for ranking in later runs
+        filename = os.path.basename(result["pdf_path"])
+        stem = os.path.splitext(filename)[0]
+        outputs = [stem + ".json", os.path.join(".sections", stem + ".json")]
+        save_outline_to_json(result["title"], result["outline"], os.path.join(output_dir, outputs[0]))
+        save_sections_to_json(result["sections"], result["subsections"], os.path.join(output_dir, outputs[1]))
+        entries[filename] = make_entry(result["pdf_path"], output_dir, outputs)
+    save_manifest(output_dir, MANIFEST_NAME, entries, manifest_settings)
+
+    # Load lightweight model once in the parent process
+    model = load_model(DEFAULT_MODEL_NAME)
+    embedding_cache = None
+    if not args.no_cache:
+        embedding_cache = EmbeddingCache(os.path.join(cache_dir, "embeddings.sqlite"), DEFAULT_MODEL_NAME,
+                                         args.embedding_cache_size)
+
+    # Collect sections from every document first so they are embedded in one batch;
+    # the global ranking is always recomputed, from saved sections for unchanged PDFs
+    all_sections = []
+    all_subsections = []
+    results_by_filename = {os.path.basename(result["pdf_path"]): result for result in results}
+    for filename in filenames:
+        if filename in results_by_filename:
+            sections = results_by_filename[filename]["sections"]
+            subsections = results_by_filename[filename]["subsections"]
+        else:
+            sections, subsections = load_sections_from_json(
+                os.path.join(output_dir, ".sections", os.path.splitext(filename)[0] + ".json"))
+        all_sections.extend(sections)
+        all_subsections.extend(subsections)
+
+    dedup_stats = {}
+    # Every query is scored against the same corpus embeddings in one matrix product
+    rankings = rank_sections_for_queries(all_sections, all_subsections, [query["job_to_be_done"] for query in queries],
+                                         model, args.batch_size, embedding_cache, dedup_stats)
 
-    for filename in os.listdir(input_dir):
-        if filename.endswith(".pdf"):
-            pdf_path = os.path.join(input_dir, filename)
-            print(f"Processing {pdf_path}...")
-            doc_name, sections, subsections = process_pdf(pdf_path, output_dir, job, model)
-            output["metadata"]["input_documents"].append(doc_name)
-            output["extracted_sections"].extend(sections)
-            output["sub_section_analysis"].extend(subsections)
+    print(f"Deduplication: embedded {dedup_stats['embedded_texts']} of {dedup_stats['texts']} texts, "
+          f"summarized {dedup_stats['summarized_subsections']} of {dedup_stats['subsections']} subsections")
+    reused_pages = sum(result["reused_pages"] for result in results)
+    if reused_pages:
+        print(f"Near-duplicate documents: {reused_pages} pages reused")
+    if extraction_cache_dir is not None:
+        hits = sum(result["extraction_cache_hit"] for result in results)
+        pages_reused = sum(result["extraction_pages_reused"] for result in results)
+        print(f"Extraction cache: {hits} hits, {len(results) - hits} misses, "
+              f"{pages_reused} pages reused from earlier versions of modified files")
+    if isinstance(model, DaemonModel):
+        stats = model.stats()
+        print(f"Embedding daemon: {stats['requests']} requests, mean batch {stats['mean_batch_texts']:.1f} texts, "
+              f"queue latency mean {stats['mean_queue_ms']:.1f} ms, max {stats['max_queue_ms']:.1f} ms")
+        model.close()
+    if embedding_cache is not None:
+        stats = embedding_cache.stats()
+        print(f"Embedding cache: {stats['hits']} hits, {stats['misses']} misses, {stats['entries']} entries")
+        embedding_cache.close()
 
-    # Save Round 1B output
-    output_path = os.path.join(output_dir, "output.json")
-    with open(output_path, 'w', encoding='utf-8') as f:
-        json.dump(output, f, indent=4, ensure_ascii=False)
+    # Save Round 1B output, one file per query
+    for query, (sections, subsections) in zip(queries, rankings):
+        output = build_output(query["persona"], query["job_to_be_done"], filenames, sections, subsections)
+        output_path = os.path.join(output_dir, query["output_filename"])
+        with open(output_path, 'w', encoding='utf-8') as f:
+            json.dump(output, f, indent=4, ensure_ascii=False)
 
-    print(f"Round 1B output saved to: {output_path}")
+        print(f"Round 1B output saved to: {output_path}")
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
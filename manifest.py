@@ -0,0 +1,70 @@
+import json
+import os
+import tempfile
+from extraction_cache import file_sha256
+
+# Bump whenever the layout of manifest entries changes
+MANIFEST_VERSION = 1
+
+def manifest_path(output_dir, name):
+    """Return the path of the named manifest inside the output directory."""
+    return os.path.join(output_dir, f".{name}-manifest.json")
+
+def load_manifest(output_dir, name, settings=None):
+    """Return the manifest's entries by input filename, or {} if it is missing or was written with other settings."""
+    path = manifest_path(output_dir, name)
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if manifest.get("version") != MANIFEST_VERSION or manifest.get("settings") != (settings or {}):
+        return {}
+    return manifest.get("files", {})
+
+def save_manifest(output_dir, name, entries, settings=None):
+    """Write the manifest atomically so an interrupted run leaves the previous one intact."""
+    manifest = {"version": MANIFEST_VERSION, "settings": settings or {}, "files": entries}
+    fd, tmp_path = tempfile.mkstemp(dir=output_dir, suffix=".tmp")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=4, ensure_ascii=False)
+    os.replace(tmp_path, manifest_path(output_dir, name))
+
+def make_entry(input_path, output_dir, outputs):
+    """Record an input's size, mtime and content hash plus the hash of each output it produced."""
+    stat = os.stat(input_path)
+    return {
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "sha256": file_sha256(input_path),
+        "outputs": {output: file_sha256(os.path.join(output_dir, output)) for output in outputs}
+    }
+
+def is_unchanged(entry, input_path, output_dir):
+    """Return True if the input matches its manifest entry and every recorded output is still intact."""
+    if entry is None:
+        return False
+    for output, output_sha256 in entry["outputs"].items():
+        output_path = os.path.join(output_dir, output)
+        if not os.path.exists(output_path) or file_sha256(output_path) != output_sha256:
+            return False
+
+    stat = os.stat(input_path)
+    if stat.st_size != entry["size"]:
+        return False
+    if stat.st_mtime_ns == entry["mtime_ns"]:
+        return True
+    # A touched but identical file is unchanged; remember the new mtime to skip hashing next time
+    if file_sha256(input_path) != entry["sha256"]:
+        return False
+    entry["mtime_ns"] = stat.st_mtime_ns
+    return True
+
+def remove_outputs(output_dir, entry):
+    """Delete the outputs recorded for an input that no longer exists."""
+    for output in entry["outputs"]:
+        output_path = os.path.join(output_dir, output)
+        if os.path.exists(output_path):
+            os.remove(output_path)
@@ -1,11 +1,67 @@
 import json
 import os
+import re
+from datetime import datetime
 
-def save_outline_to_json(title, outline, output_path):
-    """Save the extracted title and outline to a JSON file."""
-    output_data = {
+def outline_to_dict(title, outline):
+    """Return the Round 1A output document for a title and outline."""
+    return {
         "title": title,
         "outline": [{"level": h["level"], "text": h["text"], "page": h["page"]} for h in outline]
     }
+
+def save_outline_to_json(title, outline, output_path):
+    """Save the extracted title and outline to a JSON file."""
+    output_data = outline_to_dict(title, outline)
     with open(output_path, 'w', encoding='utf-8') as f:
-        json.dump(output_data, f, indent=4, ensure_ascii=False)
\ No newline at end of file
+        json.dump(output_data, f, indent=4, ensure_ascii=False)
+
+def save_sections_to_json(sections, subsections, output_path):
+    """Save a document's collected sections and subsections so later runs can rank them without reparsing."""
+    directory = os.path.dirname(output_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(output_path, 'w', encoding='utf-8') as f:
+        json.dump({"sections": sections, "subsections": subsections}, f, ensure_ascii=False)
+
+def load_sections_from_json(input_path):
+    """Load the sections and subsections saved by save_sections_to_json."""
+    with open(input_path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    return data["sections"], data["subsections"]
+
+def load_queries(config):
+    """Return the config's persona/job queries with the output file each one is written to.
+
+    A config with a single persona and job_to_be_done writes output.json. A config with a
+    "queries" list writes output_<id>.json per query, using its "id" or its 1-based position.
+    Raises ValueError if two queries would write the same file.
+    """
+    if "queries" not in config:
+        return [{"persona": config["persona"], "job_to_be_done": config["job_to_be_done"],
+                 "output_filename": "output.json"}]
+    queries = []
+    query_ids = {}
+    for i, query in enumerate(config["queries"], 1):
+        query_id = str(query.get("id", i))
+        output_filename = "output_" + re.sub(r"[^\w.-]+", "_", query_id) + ".json"
+        # Ids that differ only in characters replaced by "_" would silently overwrite each other
+        if output_filename in query_ids:
+            raise ValueError(f"queries {query_ids[output_filename]!r} and {query_id!r} would both write {output_filename}")
+        query_ids[output_filename] = query_id
+        queries.append({"persona": query["persona"], "job_to_be_done": query["job_to_be_done"],
+                        "output_filename": output_filename})
+    return queries
+
+def build_output(persona, job, input_documents, sections, subsections):
+    """Assemble the Round 1B output document from ranked sections and subsections."""
+    return {
+        "metadata": {
+            "input_documents": list(input_documents),
+            "persona": persona,
+            "job_to_be_done": job,
+            "processing_timestamp": datetime.utcnow().isoformat() + "Z"
+        },
+        "extracted_sections": sections,
+        "sub_section_analysis": subsections
+    }
\ No newline at end of file
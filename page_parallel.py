@@ -0,0 +1,57 @@
+import math
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from pdf_processor import load_pdf, get_document_title, get_page_heights, extract_line_table, close_document
+from line_table import LineTable
+from heading_detector import (merge_lines, compute_font_statistics, reduce_font_statistics, count_boilerplate_candidates,
+                              find_boilerplate, boilerplate_mask, compute_heading_confidence, assign_heading_levels)
+
+TASKS_PER_WORKER = 4
+
+def page_ranges(page_count, workers, tasks_per_worker=TASKS_PER_WORKER):
+    """Split [0, page_count) into contiguous ranges, several per worker for load balancing."""
+    pages_per_task = max(1, math.ceil(page_count / (workers * tasks_per_worker)))
+    return [(start, min(start + pages_per_task, page_count)) for start in range(0, page_count, pages_per_task)]
+
+def extract_page_range(pdf_path, start, stop, page_heights):
+    """Map phase: extract and merge the lines of a page range with their font statistics and header/footer counts."""
+    document = load_pdf(pdf_path)
+    text_blocks = extract_line_table(document, pages=range(start, stop))
+    close_document(document)
+    merged_lines = merge_lines(text_blocks)
+    return (merged_lines, compute_font_statistics(merged_lines),
+            count_boilerplate_candidates(merged_lines, page_heights), len(set(merged_lines.page_number.tolist())))
+
+def score_page_range(merged_lines, document_title, font_statistics, excluded):
+    """Score phase: compute heading confidence for a page range using document-wide font statistics."""
+    return compute_heading_confidence(merged_lines, document_title, font_statistics, excluded)
+
+def detect_headings_parallel(pdf_path, workers):
+    """Detect the outline of one document by fanning page ranges across a process pool."""
+    # Lines are never merged across pages and scoring only needs the global min/max
+    # font size plus per-page maxima, so the result matches the serial path exactly
+    document = load_pdf(pdf_path)
+    title = get_document_title(document)
+    page_heights = get_page_heights(document)
+    ranges = page_ranges(document.page_count, workers)
+    close_document(document)
+    if not ranges:
+        return title, [], LineTable.empty()
+    
+    starts, stops = zip(*ranges)
+    with ProcessPoolExecutor(max_workers=min(workers, len(ranges))) as executor:
+        mapped = list(executor.map(extract_page_range, repeat(pdf_path), starts, stops, repeat(page_heights)))
+        range_lines = [lines for lines, _, _, _ in mapped]
+        font_statistics = reduce_font_statistics([stats for _, stats, _, _ in mapped])
+        boilerplate = find_boilerplate(sum((counts for _, _, counts, _ in mapped), Counter()),
+                                       sum(text_pages for _, _, _, text_pages in mapped))
+        excluded = [boilerplate_mask(lines, boilerplate, page_heights) for lines in range_lines]
+        scored = list(executor.map(score_page_range, range_lines, repeat(title), repeat(font_statistics), excluded))
+    
+    # Only the range holding page 1 can replace an untitled document's title
+    updated_title = scored[0][1]
+    potential_headings = [heading for headings, _ in scored for heading in headings]
+    # Section text is read from these lines, so running headers and footers are left out
+    merged_lines = LineTable.concat(lines.take(~mask) for lines, mask in zip(range_lines, excluded))
+    return updated_title, assign_heading_levels(potential_headings), merged_lines
@@ -1,5 +1,39 @@
+import re
+import hashlib
 import pymupdf
+import numpy as np
 from collections import defaultdict
+from line_table import LineTable
+from extraction_cache import PageStore
+
+# Bump whenever the line records produced by extract_text_blocks change
+EXTRACTOR_VERSION = 1
+
+# MuPDF text flags per extraction profile: "outline" keeps text and span style only
+# (no image blocks, ligatures left unexpanded); "full" is MuPDF's complete dict output
+EXTRACTION_PROFILES = {
+    "outline": pymupdf.TEXTFLAGS_DICT & ~pymupdf.TEXT_PRESERVE_IMAGES,
+    "full": pymupdf.TEXTFLAGS_DICT
+}
+DEFAULT_PROFILE = "outline"
+
+# Pages between flushes of MuPDF's resource store while streaming; flushing every page
+# keeps memory lowest but re-decodes shared fonts several times over
+STORE_SHRINK_INTERVAL = 16
+
+# Near-duplicate detection: MinHash over word shingles of the first pages of each document
+SIGNATURE_PAGES = 3
+SHINGLE_SIZE = 5
+SIGNATURE_SIZE = 64
+NEAR_DUPLICATE_THRESHOLD = 0.8
+# Largest prime below 2**32: a * hash + b modulo it never overflows uint64 for 32-bit shingle hashes
+_SIGNATURE_PRIME = np.uint64(4294967291)
+_rng = np.random.default_rng(20240701)
+_SIGNATURE_A = _rng.integers(1, _SIGNATURE_PRIME, SIGNATURE_SIZE, dtype=np.uint64)
+_SIGNATURE_B = _rng.integers(0, _SIGNATURE_PRIME, SIGNATURE_SIZE, dtype=np.uint64)
+
+# An indirect reference ("12 0 R") inside the source of a PDF object
+OBJECT_REFERENCE = re.compile(r"\b(\d+) \d+ R\b")
 
 def load_pdf(pdf_path):
     """Load a PDF file and return the document object."""
@@ -10,34 +44,223 @@ def get_document_title(document):
     title = document.metadata.get("title", "Untitled Document")
     return title if title and title.strip() else "Untitled Document"
 
-def extract_text_blocks(document):
-    """Extract text blocks from all pages of the document."""
-    all_lines_data = []
+def get_page_heights(document):
+    """Return the height of every page as displayed, with its /Rotate applied like the line coordinates."""
+    return [document[page_number].rect.height for page_number in range(document.page_count)]
+
+def get_toc_entries(document):
+    """Read the embedded TOC as dicts with level, title, 1-based page and destination y (None if unknown)."""
+    entries = []
+    for level, title, page_number, destination in document.get_toc(simple=False):
+        if page_number < 1 or not title.strip():
+            continue
+        y = None
+        if destination.get("kind") == pymupdf.LINK_GOTO and "to" in destination and destination["to"].y >= 0:
+            y = float(destination["to"].y)
+        entries.append({"level": level, "title": title.strip(), "page": page_number, "y": y})
+    return entries
+
+def document_signature(document, pages=SIGNATURE_PAGES, profile=DEFAULT_PROFILE):
+    """Return a MinHash signature over word shingles of the first pages, or None if they carry no text."""
+    flags = EXTRACTION_PROFILES[profile]
+    words = []
+    for page_number in range(min(pages, document.page_count)):
+        for text in _extract_page(document[page_number], page_number, flags).text:
+            words.extend(word.lower() for word in text.split())
+    if not words:
+        return None
+    
+    shingles = {" ".join(words[i:i + SHINGLE_SIZE]) for i in range(max(1, len(words) - SHINGLE_SIZE + 1))}
+    hashes = np.fromiter((int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=4).digest(), "little")
+                          for shingle in shingles), dtype=np.uint64, count=len(shingles)) % _SIGNATURE_PRIME
+    return ((hashes[:, None] * _SIGNATURE_A + _SIGNATURE_B) % _SIGNATURE_PRIME).min(axis=0)
+
+def signature_similarity(signature, other):
+    """Estimate the Jaccard similarity of two documents' shingle sets from their signatures."""
+    if signature is None or other is None:
+        return 0.0
+    return float(np.mean(signature == other))
+
+def group_near_duplicates(pdf_paths, threshold=NEAR_DUPLICATE_THRESHOLD):
+    """Group PDFs whose first pages are near-identical; each group is a list of paths in input order."""
+    groups = []
+    representatives = []
+    for pdf_path in pdf_paths:
+        document = load_pdf(pdf_path)
+        signature = document_signature(document)
+        close_document(document)
+        for group, representative in zip(groups, representatives):
+            if signature_similarity(signature, representative) >= threshold:
+                group.append(pdf_path)
+                break
+        else:
+            groups.append([pdf_path])
+            representatives.append(signature)
+    return groups
+
+def is_extraction_cached(pdf_path, cache, profile=DEFAULT_PROFILE):
+    """Return True if the cache already holds the file's extracted lines, checked without opening the PDF."""
+    return cache.contains(cache.key_for(pdf_path, _extractor_version(profile)))
+
+def object_digest(document, xref, object_digests):
+    """Hash a PDF object and its stream, with every indirect reference replaced by the hash of its target.
+
+    Object numbers differ between files, so two objects hash alike exactly when their contents
+    and everything they reference (widths, encodings, font descriptors and files) are identical.
+    object_digests memoizes the hashes by xref and must only be shared within one document.
+    """
+    if xref in object_digests:
+        return object_digests[xref]
+    # A reference cycle hashes as empty instead of recursing forever
+    object_digests[xref] = b""
+    digest = hashlib.blake2b(digest_size=16)
+    _update_with_source(digest, document, document.xref_object(xref, compressed=True), object_digests)
+    if document.xref_is_stream(xref):
+        # The raw bytes together with the /Filter in the dictionary determine the decoded data
+        digest.update(document.xref_stream_raw(xref) or b"")
+    object_digests[xref] = digest.digest()
+    return object_digests[xref]
+
+def _update_with_source(digest, document, source, object_digests):
+    """Feed PDF object source to digest, hashing each referenced object in place of its number."""
+    parts = OBJECT_REFERENCE.split(source)
+    for i, part in enumerate(parts):
+        if i % 2 and 0 < int(part) < document.xref_length():
+            digest.update(object_digest(document, int(part), object_digests))
+        else:
+            digest.update(part.encode("utf-8"))
+
+def page_fingerprint(page, object_digests=None):
+    """Hash what determines a page's extracted text: geometry, content stream and resources.
+
+    Resources (fonts with their widths, encodings and ToUnicode maps, form XObjects) are hashed
+    as resolved objects. object_digests memoizes them by xref; pass the same dict for every page
+    of a document so each shared object is read and hashed once.
+    """
+    document = page.parent
+    object_digests = {} if object_digests is None else object_digests
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(repr((tuple(page.cropbox), page.rotation)).encode("utf-8"))
+    digest.update(page.read_contents())
+    # Resources may be inherited from an ancestor in the page tree
+    xref = page.xref
+    kind, value = document.xref_get_key(xref, "Resources")
+    while kind == "null":
+        parent_kind, parent = document.xref_get_key(xref, "Parent")
+        if parent_kind != "xref":
+            break
+        xref = int(parent.split()[0])
+        kind, value = document.xref_get_key(xref, "Resources")
+    if kind == "xref":
+        digest.update(object_digest(document, int(value.split()[0]), object_digests))
+    else:
+        _update_with_source(digest, document, value, object_digests)
+    return digest.hexdigest()
+
+def extract_line_table(document, cache=None, pages=None, profile=DEFAULT_PROFILE, page_store=None, track_versions=True):
+    """Extract text lines from the document (or only the given 0-based pages) into a LineTable.
+
+    With a page_store, pages whose fingerprint was already extracted (typically from a
+    near-duplicate document) are copied from the store instead of being parsed again.
+    With track_versions=False (files at throwaway paths) the cache entry is keyed by content
+    only: no previous version is looked up and no page fingerprints or path pointer are stored.
+    """
+    flags = EXTRACTION_PROFILES[profile]
+    extractor_version = _extractor_version(profile)
+    cache_key = None
+    previous_fingerprints = set()
+    if cache is not None and document.name and pages is None:
+        cache_key = cache.key_for(document.name, extractor_version)
+        cached_table = cache.get(cache_key)
+        if cached_table is not None:
+            return cached_table
+        # A re-saved file usually changes only a few pages; the rest are copied from its previous version
+        previous = cache.get_previous(document.name, extractor_version) if track_versions else None
+        if previous is not None:
+            page_store = page_store if page_store is not None else PageStore()
+            _store_pages(page_store, previous[0], previous[1], flags)
+            previous_fingerprints = set(previous[1])
     
-    for page_number, page in enumerate(document):
-        blocks = page.get_text("dict")["blocks"]
-        for block in blocks:
-            if block["type"] == 0:  # Text block
-                for line in block["lines"]:
-                    line_text = " ".join([span["text"].strip() for span in line["spans"]]).strip()
-                    if not line_text:
-                        continue
-                    
-                    dominant_font_size = round(line["spans"][0]["size"], 2) if line["spans"] else 0.0
-                    dominant_is_bold = any((span["flags"] & 2**4) != 0 for span in line["spans"]) if line["spans"] else False
-                    
-                    all_lines_data.append({
-                        "text": line_text,
-                        "font_size": dominant_font_size,
-                        "bbox": [round(coord, 2) for coord in line["bbox"]],
-                        "page_number": page_number + 1,
-                        "is_bold": dominant_is_bold,
-                        "line_y0": round(line["bbox"][1], 2),
-                        "line_x0": round(line["bbox"][0], 2),
-                        "line_y1": round(line["bbox"][3], 2)
-                    })
+    # Pages are fingerprinted only for a page_store or for the cache entry a later version will reuse
+    object_digests = {} if (cache_key is not None and track_versions) or page_store is not None else None
+    pages = range(document.page_count) if pages is None else pages
+    extracted = [_extract_shared_page(document, page_number, flags, page_store, object_digests) for page_number in pages]
+    table = LineTable.concat(page_table for page_table, _ in extracted)
+    if cache_key is not None and not track_versions:
+        cache.put(cache_key, table)
+    elif cache_key is not None:
+        fingerprints = [fingerprint for _, fingerprint in extracted]
+        cache.pages_reused += sum(fingerprint in previous_fingerprints for fingerprint in fingerprints)
+        cache.put(cache_key, table, fingerprints, document.name, extractor_version)
+    return table
+
+def _extractor_version(profile):
+    """Return the version string cache entries of a profile are stored under."""
+    return f"{EXTRACTOR_VERSION}-{profile}"
+
+def _store_pages(page_store, table, fingerprints, flags):
+    """Put every page of a table extracted earlier into the page_store under its fingerprint."""
+    bounds = np.searchsorted(table.page_number, np.arange(1, len(fingerprints) + 2))
+    for page_index, fingerprint in enumerate(fingerprints):
+        page_store.put((flags, fingerprint), table.take(np.arange(bounds[page_index], bounds[page_index + 1])))
+
+def iter_page_tables(document, pages=None, profile=DEFAULT_PROFILE, shrink_interval=STORE_SHRINK_INTERVAL):
+    """Yield one LineTable per page without keeping earlier pages alive."""
+    flags = EXTRACTION_PROFILES[profile]
+    for count, page_number in enumerate(range(document.page_count) if pages is None else pages, 1):
+        table = _extract_page(document[page_number], page_number, flags)
+        if shrink_interval and count % shrink_interval == 0:
+            # Fonts and images MuPDF cached for earlier pages would otherwise accumulate
+            pymupdf.TOOLS.store_shrink(100)
+        yield table
+
+def _extract_shared_page(document, page_number, flags, page_store, object_digests=None):
+    """Extract one page, reusing the page_store's table for an identical page; returns (table, fingerprint).
+
+    The fingerprint is None unless object_digests, the document's memo for page_fingerprint, is given.
+    """
+    page = document[page_number]
+    fingerprint = page_fingerprint(page, object_digests) if object_digests is not None else None
+    if page_store is None:
+        return _extract_page(page, page_number, flags), fingerprint
+    table = page_store.get((flags, fingerprint), page_number + 1)
+    if table is None:
+        table = _extract_page(page, page_number, flags)
+        page_store.put((flags, fingerprint), table)
+    return table, fingerprint
+
+def _extract_page(page, page_number, flags):
+    """Extract the text lines of a single page into a LineTable."""
+    texts, font_sizes, x0s, y0s, x1s, y1s, page_numbers, bold_flags = [], [], [], [], [], [], [], []
+    
+    # Parse the page once; every later stage, section text included, reads these lines
+    textpage = page.get_textpage(flags=flags)
+    blocks = textpage.extractDICT()["blocks"]
+    for block in blocks:
+        if block["type"] == 0:  # Text block
+            for line in block["lines"]:
+                line_text = " ".join([span["text"].strip() for span in line["spans"]]).strip()
+                if not line_text:
+                    continue
+                
+                dominant_font_size = round(line["spans"][0]["size"], 2) if line["spans"] else 0.0
+                dominant_is_bold = any((span["flags"] & 2**4) != 0 for span in line["spans"]) if line["spans"] else False
+                x0, y0, x1, y1 = [round(coord, 2) for coord in line["bbox"]]
+                
+                texts.append(line_text)
+                font_sizes.append(dominant_font_size)
+                x0s.append(x0)
+                y0s.append(y0)
+                x1s.append(x1)
+                y1s.append(y1)
+                page_numbers.append(page_number + 1)
+                bold_flags.append(dominant_is_bold)
     
-    return all_lines_data
+    return LineTable(texts, font_sizes, x0s, y0s, x1s, y1s, page_numbers, bold_flags)
+
+def extract_text_blocks(document, cache=None, pages=None, profile=DEFAULT_PROFILE):
+    """Extract text blocks from the document as line dicts; see extract_line_table."""
+    return extract_line_table(document, cache, pages, profile).to_records()
 
 def close_document(document):
     """Close the PDF document to free resources."""
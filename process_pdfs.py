@@ -3,6 +3,8 @@ import json
 import os
 import re
 from collections import defaultdict
+from manifest import load_manifest, save_manifest, make_entry, is_unchanged, remove_outputs
+from pdf_processor import EXTRACTION_PROFILES
 
 def extract_headings_and_title(pdf_path):
     document = pymupdf.open(pdf_path)
@@ -14,7 +16,7 @@ def extract_headings_and_title(pdf_path):
     all_lines_data = []
 
     for page_number, page in enumerate(document):
-        blocks = page.get_text("dict")["blocks"]
+        blocks = page.get_text("dict", flags=EXTRACTION_PROFILES["outline"])["blocks"]
         for block in blocks:
             if block["type"] == 0:
                 for line_idx, line in enumerate(block["lines"]):
@@ -371,9 +373,22 @@ if __name__ == "__main__":
     except Exception as e:
         print(f"An error occurred while creating the dummy PDF: {e}")
 
-    for filename in os.listdir(input_dir):
+    # Skip PDFs whose input and output are unchanged since the last run
+    previous_entries = load_manifest(output_dir, "process_pdfs")
+    entries = {}
+    filenames = os.listdir(input_dir)
+    for filename, entry in previous_entries.items():
+        if filename not in filenames:
+            print(f"Removing outputs of deleted input {filename}")
+            remove_outputs(output_dir, entry)
+
+    for filename in filenames:
         if filename.endswith(".pdf"):
             pdf_path = os.path.join(input_dir, filename)
+            if is_unchanged(previous_entries.get(filename), pdf_path, output_dir):
+                print(f"Skipping unchanged {pdf_path}")
+                entries[filename] = previous_entries[filename]
+                continue
             print(f"Processing {pdf_path}...")
 
             extracted_outline = extract_headings_and_title(pdf_path)
@@ -388,3 +403,6 @@ if __name__ == "__main__":
             print("\nSample of extracted outline:")
             print(json.dumps(extracted_outline, indent=4, ensure_ascii=False))
             print("-" * 50)
+            entries[filename] = make_entry(pdf_path, output_dir, [output_json_filename])
+
+    save_manifest(output_dir, "process_pdfs", entries)
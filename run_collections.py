@@ -0,0 +1,131 @@
+import os
+import json
+import argparse
+from main import parse_pdfs
+from output_handler import load_queries, build_output
+from extraction_cache import file_sha256
+from embedding_cache import DEFAULT_MAX_ENTRIES, EmbeddingCache
+from semantic_analyzer import DEFAULT_BATCH_SIZE, DEFAULT_MODEL_NAME, load_model, rank_sections_for_queries
+
+DEFAULT_DATASET_DIR = os.path.join("dataset", "Challenge_1b")
+
+
+def discover_collections(dataset_dir):
+    """Return the collection directories (those with a PDFs/ folder) under dataset_dir, sorted by name."""
+    return [os.path.join(dataset_dir, name) for name in sorted(os.listdir(dataset_dir))
+            if os.path.isdir(os.path.join(dataset_dir, name, "PDFs"))]
+
+
+def load_collection_config(collection_dir):
+    """Return a collection's persona/job config in main's config.json format, or None if it has none.
+
+    challenge1b_input.json and config.json are read first; otherwise the persona and job recorded
+    in the metadata of the expected challenge1b_output.json are used.
+    """
+    input_path = os.path.join(collection_dir, "challenge1b_input.json")
+    if os.path.exists(input_path):
+        with open(input_path, 'r', encoding='utf-8') as f:
+            challenge_input = json.load(f)
+        persona = challenge_input["persona"]
+        job = challenge_input["job_to_be_done"]
+        return {"persona": persona.get("role", persona) if isinstance(persona, dict) else persona,
+                "job_to_be_done": job.get("task", job) if isinstance(job, dict) else job}
+    config_path = os.path.join(collection_dir, "config.json")
+    if os.path.exists(config_path):
+        with open(config_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    expected_path = os.path.join(collection_dir, "challenge1b_output.json")
+    if os.path.exists(expected_path):
+        with open(expected_path, 'r', encoding='utf-8') as f:
+            metadata = json.load(f)["metadata"]
+        return {"persona": metadata["persona"], "job_to_be_done": metadata["job_to_be_done"]}
+    return None
+
+
+def with_document(entries, filename):
+    """Copy section or subsection entries, labelling them with the collection's file name."""
+    return [dict(entry, document=filename) for entry in entries]
+
+
+def parse_args(argv=None):
+    """Parse command-line options."""
+    parser = argparse.ArgumentParser(description="Generate Round 1B output for every collection in a dataset.")
+    parser.add_argument("dataset_dir", nargs="?", default=DEFAULT_DATASET_DIR,
+                        help="Directory whose subdirectories each hold a PDFs/ folder")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE,
+                        help="Number of texts per embedding batch")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Number of processes used to parse PDFs in parallel")
+    parser.add_argument("--cache-dir", default=None,
+                        help="Directory for persistent caches (default: <dataset_dir>/.cache)")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="Keep embeddings in memory for this run only and disable the extraction cache")
+    parser.add_argument("--embedding-cache-size", type=int, default=DEFAULT_MAX_ENTRIES,
+                        help="Maximum number of cached embeddings before LRU eviction")
+    parser.add_argument("--use-toc", action="store_true",
+                        help="Take headings from a sufficiently complete embedded TOC instead of scoring every line")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """Parse every collection's PDFs in one worker pool, then rank each collection with one shared model."""
+    args = parse_args(argv)
+    cache_dir = args.cache_dir or os.path.join(args.dataset_dir, ".cache")
+
+    collections = []
+    for collection_dir in discover_collections(args.dataset_dir):
+        config = load_collection_config(collection_dir)
+        if config is None:
+            print(f"Skipping {collection_dir}: no challenge1b_input.json, config.json or challenge1b_output.json")
+            continue
+        pdf_dir = os.path.join(collection_dir, "PDFs")
+        filenames = [filename for filename in sorted(os.listdir(pdf_dir)) if filename.endswith(".pdf")]
+        collections.append((collection_dir, load_queries(config), filenames))
+
+    # A PDF shared by several collections is identified by its content and parsed once
+    paths_by_hash = {}
+    hashes = {}
+    for collection_dir, _, filenames in collections:
+        for filename in filenames:
+            pdf_path = os.path.join(collection_dir, "PDFs", filename)
+            hashes[pdf_path] = file_sha256(pdf_path)
+            paths_by_hash.setdefault(hashes[pdf_path], pdf_path)
+    pdf_count = len(hashes)
+    print(f"{len(collections)} collections, {pdf_count} PDFs, {len(paths_by_hash)} distinct")
+    extraction_cache_dir = None if args.no_cache else os.path.join(cache_dir, "extraction")
+    unique_paths = list(paths_by_hash.values())
+    results = parse_pdfs(unique_paths, extraction_cache_dir, args.workers, use_toc=args.use_toc)
+    results_by_hash = {hashes[pdf_path]: result for pdf_path, result in zip(unique_paths, results)}
+
+    # One model for every collection; embeddings of shared sections are reused across collections
+    model = load_model(DEFAULT_MODEL_NAME)
+    if args.no_cache:
+        embedding_cache = EmbeddingCache(":memory:", DEFAULT_MODEL_NAME, args.embedding_cache_size)
+    else:
+        embedding_cache = EmbeddingCache(os.path.join(cache_dir, "embeddings.sqlite"), DEFAULT_MODEL_NAME,
+                                         args.embedding_cache_size)
+
+    for collection_dir, queries, filenames in collections:
+        all_sections = []
+        all_subsections = []
+        for filename in filenames:
+            result = results_by_hash[hashes[os.path.join(collection_dir, "PDFs", filename)]]
+            all_sections.extend(with_document(result["sections"], filename))
+            all_subsections.extend(with_document(result["subsections"], filename))
+        rankings = rank_sections_for_queries(all_sections, all_subsections,
+                                             [query["job_to_be_done"] for query in queries], model, args.batch_size,
+                                             embedding_cache)
+        for query, (sections, subsections) in zip(queries, rankings):
+            output = build_output(query["persona"], query["job_to_be_done"], filenames, sections, subsections)
+            output_path = os.path.join(collection_dir, query["output_filename"])
+            with open(output_path, 'w', encoding='utf-8') as f:
+                json.dump(output, f, indent=4, ensure_ascii=False)
+            print(f"Round 1B output saved to: {output_path}")
+
+    stats = embedding_cache.stats()
+    print(f"Embedding cache: {stats['hits']} hits, {stats['misses']} misses, {stats['entries']} entries")
+    embedding_cache.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,85 +1,214 @@
-from sentence_transformers import SentenceTransformer
-from sumy.parsers.plaintext import PlaintextParser
-from sumy.nlp.tokenizers import Tokenizer
-from sumy.summarizers.lsa import LsaSummarizer
+import bisect
+import functools
 import numpy as np
-from sklearn.metrics.pairwise import cosine_similarity
-import nltk
 import re
+from collections import Counter
+from heading_detector import build_line_index, heading_line
+from embedding_cache import normalize_text
+from embedding_daemon import connect_daemon
 
-# Download required NLTK data during Docker build
-nltk.download('punkt', quiet=True)
+# sentence_transformers (torch), sumy and nltk are imported on first use so that importing this
+# module, and the Round 1A path, stays fast. NLTK data is installed during the Docker build and is
+# only looked up locally; nothing is downloaded at run time.
+
+DEFAULT_MODEL_NAME = "all-MiniLM-L6-v2"
+DEFAULT_BATCH_SIZE = 64
+
+SENTENCE_BOUNDARY = re.compile(r"(?<=[.!?])\s+")
+
+def load_model(model_name=DEFAULT_MODEL_NAME, use_daemon=True):
+    """Return a running embedding daemon's client if one serves model_name, else load the model in-process."""
+    if use_daemon:
+        model = connect_daemon(model_name)
+        if model is not None:
+            print(f"Using embedding daemon at {model.socket_path}")
+            return model
+    from sentence_transformers import SentenceTransformer
+    return SentenceTransformer(model_name)
+
+@functools.lru_cache(maxsize=None)
+def _sentence_tokenizer():
+    """Return sumy's English tokenizer, or None if its NLTK data is not installed locally."""
+    from sumy.nlp.tokenizers import Tokenizer
+    try:
+        return Tokenizer("english")
+    except LookupError:
+        return None
 
 def extract_keywords(job_description, top_n=10):
     """Extract top keywords from the job description using TF-IDF."""
-    words = nltk.word_tokenize(job_description.lower())
+    import nltk
+    try:
+        words = nltk.word_tokenize(job_description.lower())
+    except LookupError:
+        words = re.findall(r"\w+", job_description.lower())
     words = [w for w in words if w.isalnum() and len(w) > 2]
-    freq = nltk.FreqDist(words)
+    freq = Counter(words)
     total = sum(freq.values())
     tf_scores = {word: count / total for word, count in freq.items()}
     return sorted(tf_scores.items(), key=lambda x: x[1], reverse=True)[:top_n]
 
-def compute_relevance(text, job_description, model):
-    """Compute relevance score of text to job description using embeddings."""
-    embeddings = model.encode([text, job_description])
-    return cosine_similarity([embeddings[0]], [embeddings[1]])[0][0]
+def _encode_batch(texts, model, batch_size):
+    """Run the model over texts and L2-normalize the resulting embeddings."""
+    embeddings = np.asarray(model.encode(texts, batch_size=batch_size, show_progress_bar=False), dtype=np.float32)
+    norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+    return embeddings / np.maximum(norms, 1e-12)
+
+def encode_texts(texts, model, batch_size=DEFAULT_BATCH_SIZE, cache=None):
+    """Encode texts in batches and return L2-normalized embeddings as a float32 matrix."""
+    texts = list(texts)
+    if cache is None:
+        return _encode_batch(texts, model, batch_size)
+    
+    # Only texts missing from the embedding cache reach the model
+    embeddings = cache.get_many(texts)
+    missing = [i for i in range(len(texts)) if i not in embeddings]
+    if missing:
+        fresh = _encode_batch([texts[i] for i in missing], model, batch_size)
+        cache.put_many([texts[i] for i in missing], fresh)
+        embeddings.update(zip(missing, fresh))
+    if not texts:
+        return np.zeros((0, 0), dtype=np.float32)
+    return np.stack([embeddings[i] for i in range(len(texts))])
+
+def unique_texts(texts):
+    """Return the distinct texts by normalized form (first occurrence kept) and each text's index into them."""
+    index_by_key = {}
+    unique = []
+    inverse = []
+    for text in texts:
+        key = normalize_text(text)
+        if key not in index_by_key:
+            index_by_key[key] = len(unique)
+            unique.append(text)
+        inverse.append(index_by_key[key])
+    return unique, inverse
 
 def summarize_text(text, sentences_count=2):
     """Summarize text to a specified number of sentences using LSA."""
-    parser = PlaintextParser.from_string(text, Tokenizer("english"))
+    tokenizer = _sentence_tokenizer()
+    if tokenizer is None:
+        # Without the punkt data fall back to the leading sentences
+        return " ".join(SENTENCE_BOUNDARY.split(" ".join(text.split()))[:sentences_count])
+    from sumy.parsers.plaintext import PlaintextParser
+    from sumy.summarizers.lsa import LsaSummarizer
+    parser = PlaintextParser.from_string(text, tokenizer)
     summarizer = LsaSummarizer()
     summary = summarizer(parser.document, sentences_count)
     return " ".join([str(sentence) for sentence in summary])
 
-def extract_sections_and_subsections(pdf_path, outline, document, job_description, model):
-    """Extract and rank sections and subsections based on relevance."""
+def collect_sections_and_subsections(pdf_path, outline, lines):
+    """Extract section and paragraph texts for every heading from the merged lines without scoring them."""
     sections = []
     subsections = []
     
-    for i, heading in enumerate(outline):
-        # Extract section text
-        page = document[heading["page"] - 1]
-        next_page = document[outline[i + 1]["page"] - 1] if i + 1 < len(outline) else None
+    # Resolve each heading to its source line; a section runs until the next heading line
+    # on the same page (in reading order, not outline order) or the end of the page
+    line_index = build_line_index(lines)
+    heading_rows = [heading_line(heading, line_index) for heading in outline]
+    boundaries = sorted(set(row for row in heading_rows if row is not None))
+    
+    for heading, row in zip(outline, heading_rows):
+        # Section text comes from the lines already extracted for heading detection,
+        # so no page is parsed a second time
         text = ""
-        if next_page and outline[i + 1]["page"] == heading["page"]:
-            rect = [0, heading["line_y0"], page.rect.width, outline[i + 1]["line_y0"]]
-        else:
-            rect = [0, heading["line_y0"], page.rect.width, page.rect.height]
-        text = page.get_text("text", clip=rect).strip()
-        
-        # Compute relevance
-        relevance_score = compute_relevance(text, job_description, model)
+        if row is not None:
+            page_stop = int(np.searchsorted(lines.page_number, heading["page"], side="right"))
+            position = bisect.bisect_right(boundaries, row)
+            stop = min(boundaries[position], page_stop) if position < len(boundaries) else page_stop
+            text = "\n".join(lines.text[row:stop]).strip()
         
-        # Add section
         sections.append({
             "document": pdf_path,
             "page_number": heading["page"],
             "section_title": heading["text"],
-            "importance_rank": 0,  # To be updated after sorting
-            "relevance_score": relevance_score
+            "text": text
         })
         
         # Extract subsections (split by paragraphs or subheadings)
         paragraphs = [p.strip() for p in text.split("\n\n") if p.strip()]
-        for j, para in enumerate(paragraphs):
+        for para in paragraphs:
             if len(para.split()) > 10:  # Ignore very short paragraphs
-                relevance_score = compute_relevance(para, job_description, model)
-                refined_text = summarize_text(para, sentences_count=1)
                 subsections.append({
                     "document": pdf_path,
                     "page_number": heading["page"],
-                    "refined_text": refined_text,
-                    "importance_rank": 0,  # To be updated after sorting
-                    "relevance_score": relevance_score
+                    "text": para
                 })
     
+    return sections, subsections
+
+def rank_sections_for_queries(sections, subsections, job_descriptions, model, batch_size=DEFAULT_BATCH_SIZE, cache=None,
+                              stats=None):
+    """Score collected sections and subsections against several job descriptions; returns one ranking per job."""
+    texts = [section["text"] for section in sections] + [subsection["text"] for subsection in subsections]
+    
+    # Encode all job descriptions in one batch and every distinct text once; with normalized
+    # embeddings the cosine similarities of every query form a single (queries x texts) matrix product.
+    # It is accumulated in float64 so a query scores the same whether it runs alone or with others
+    job_embeddings = encode_texts(job_descriptions, model, batch_size, cache)
+    unique, inverse = unique_texts(texts)
+    scores = np.zeros((len(job_descriptions), 0), dtype=np.float32)
+    if unique:
+        corpus_embeddings = encode_texts(unique, model, batch_size, cache)
+        scores = (job_embeddings.astype(np.float64) @ corpus_embeddings.T.astype(np.float64)).astype(np.float32)
+        scores = scores[:, inverse]
+    
+    # Repeated paragraphs (disclaimers, shared blurbs) are summarized once, for all queries
+    summaries = {}
+    for subsection in subsections:
+        key = normalize_text(subsection["text"])
+        if key not in summaries:
+            summaries[key] = summarize_text(subsection["text"], sentences_count=1)
+    
+    if stats is not None:
+        stats["texts"] = stats.get("texts", 0) + len(texts)
+        stats["embedded_texts"] = stats.get("embedded_texts", 0) + len(unique)
+        stats["subsections"] = stats.get("subsections", 0) + len(subsections)
+        stats["summarized_subsections"] = stats.get("summarized_subsections", 0) + len(summaries)
+    
+    refined_texts = [summaries[normalize_text(subsection["text"])] for subsection in subsections]
+    return [rank_by_scores(sections, subsections, query_scores, refined_texts) for query_scores in scores]
+
+def rank_by_scores(sections, subsections, scores, refined_texts):
+    """Build the ranked section and subsection entries for one query's scores (sections first, then subsections)."""
+    ranked_sections = []
+    for section, score in zip(sections, scores[:len(sections)]):
+        ranked_sections.append({
+            "document": section["document"],
+            "page_number": section["page_number"],
+            "section_title": section["section_title"],
+            "importance_rank": 0,  # To be updated after sorting
+            "relevance_score": float(score)
+        })
+    
+    ranked_subsections = []
+    for subsection, refined_text, score in zip(subsections, refined_texts, scores[len(sections):]):
+        ranked_subsections.append({
+            "document": subsection["document"],
+            "page_number": subsection["page_number"],
+            "refined_text": refined_text,
+            "importance_rank": 0,  # To be updated after sorting
+            "relevance_score": float(score)
+        })
+    
     # Rank sections and subsections
-    sections.sort(key=lambda x: x["relevance_score"], reverse=True)
-    for i, section in enumerate(sections, 1):
+    ranked_sections.sort(key=lambda x: x["relevance_score"], reverse=True)
+    for i, section in enumerate(ranked_sections, 1):
         section["importance_rank"] = i
     
-    subsections.sort(key=lambda x: x["relevance_score"], reverse=True)
-    for i, subsection in enumerate(subsections, 1):
+    ranked_subsections.sort(key=lambda x: x["relevance_score"], reverse=True)
+    for i, subsection in enumerate(ranked_subsections, 1):
         subsection["importance_rank"] = i
     
-    return sections, subsections
\ No newline at end of file
+    return ranked_sections, ranked_subsections
+
+def rank_sections_and_subsections(sections, subsections, job_description, model, batch_size=DEFAULT_BATCH_SIZE, cache=None,
+                                  stats=None):
+    """Score collected sections and subsections against the job description and rank them."""
+    return rank_sections_for_queries(sections, subsections, [job_description], model, batch_size, cache, stats)[0]
+
+def extract_sections_and_subsections(pdf_path, outline, lines, job_description, model, batch_size=DEFAULT_BATCH_SIZE, cache=None,
+                                     stats=None):
+    """Extract and rank sections and subsections based on relevance."""
+    sections, subsections = collect_sections_and_subsections(pdf_path, outline, lines)
+    return rank_sections_and_subsections(sections, subsections, job_description, model, batch_size, cache, stats)
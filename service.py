@@ -0,0 +1,248 @@
+"""Long-running HTTP service for the Round 1A outline and Round 1B ranking.
+
+The embedding model is loaded once at startup; PDF parsing runs in a bounded process pool.
+
+    POST /outline?filename=doc.pdf   body: PDF bytes
+    POST /rank                       body: {"persona": ..., "job_to_be_done": ...,
+                                            "documents": [{"filename": ..., "content": <base64 PDF>}]}
+    GET  /health
+"""
+import argparse
+import base64
+import binascii
+import json
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+import pymupdf
+from main import parse_pdf
+from output_handler import outline_to_dict, build_output
+from semantic_analyzer import DEFAULT_BATCH_SIZE, DEFAULT_MODEL_NAME, load_model, rank_sections_and_subsections
+
+DEFAULT_PORT = 8080
+# Documents waiting for a worker beyond those being parsed; further requests get 503
+DEFAULT_MAX_QUEUE = 16
+DEFAULT_REQUEST_TIMEOUT = 120.0
+MAX_BODY_BYTES = 200 * 1024 * 1024
+
+class ServiceError(Exception):
+    """Raised to answer a request with an HTTP error status."""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+def parse_upload(filename, pdf_bytes, extraction_cache_dir=None):
+    """Parse uploaded PDF bytes in a worker process; returns the result and the time the worker started."""
+    started = time.time()
+    filename = os.path.basename(filename) or "upload.pdf"
+    with tempfile.TemporaryDirectory() as directory:
+        pdf_path = os.path.join(directory, filename)
+        with open(pdf_path, "wb") as f:
+            f.write(pdf_bytes)
+        # The temporary path is never seen again, so the cache keeps no previous-version pointer for it
+        result = parse_pdf(pdf_path, extraction_cache_dir, track_versions=False)
+    result["pdf_path"] = filename
+    for section in result["sections"] + result["subsections"]:
+        section["document"] = filename
+    return result, started
+
+class PipelineService:
+    """Admission control, the parsing pool and the resident model shared by all request threads."""
+
+    def __init__(self, model, workers, max_queue=DEFAULT_MAX_QUEUE, request_timeout=DEFAULT_REQUEST_TIMEOUT,
+                 batch_size=DEFAULT_BATCH_SIZE, extraction_cache_dir=None):
+        self.model = model
+        # Workers start lazily from handler threads of a process that already holds the model;
+        # forking there can deadlock, so they come from a clean forkserver (spawn where unavailable)
+        start_method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+        self.executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context(start_method))
+        self.capacity = workers + max_queue
+        self.request_timeout = request_timeout
+        self.batch_size = batch_size
+        self.extraction_cache_dir = extraction_cache_dir
+        self.lock = threading.Lock()
+        # The model is not safe to call from several threads at once
+        self.model_lock = threading.Lock()
+        self.pending = 0
+        self.requests = 0
+        self.rejected = 0
+
+    def _release(self, _future):
+        with self.lock:
+            self.pending -= 1
+
+    def parse(self, documents):
+        """Parse (filename, bytes) pairs in the pool; returns results in order and the timing in ms."""
+        if len(documents) > self.capacity:
+            raise ServiceError(413, f"at most {self.capacity} documents per request")
+        with self.lock:
+            if self.pending + len(documents) > self.capacity:
+                self.rejected += 1
+                raise ServiceError(503, f"queue full ({self.pending} documents pending)")
+            self.pending += len(documents)
+            self.requests += 1
+
+        submitted = time.time()
+        futures = []
+        for filename, pdf_bytes in documents:
+            future = self.executor.submit(parse_upload, filename, pdf_bytes, self.extraction_cache_dir)
+            # Slots are freed when parsing ends, even if the request has already timed out
+            future.add_done_callback(self._release)
+            futures.append(future)
+        results = []
+        queue_seconds = 0.0
+        try:
+            for (filename, _), future in zip(documents, futures):
+                remaining = submitted + self.request_timeout - time.time()
+                try:
+                    result, started = future.result(timeout=max(remaining, 0))
+                except pymupdf.FileDataError:
+                    # The worker's message names its temporary path, so it is not passed on
+                    raise ServiceError(400, f"{os.path.basename(filename) or 'upload.pdf'} is not a readable PDF")
+                results.append(result)
+                queue_seconds = max(queue_seconds, started - submitted)
+        except FutureTimeoutError:
+            for future in futures:
+                future.cancel()
+            raise ServiceError(504, f"parsing did not finish within {self.request_timeout:.0f} s")
+        return results, {"queue_ms": queue_seconds * 1000, "parse_ms": (time.time() - submitted) * 1000}
+
+    def outline(self, filename, pdf_bytes):
+        """Return the Round 1A outline for one PDF."""
+        results, timing = self.parse([(filename, pdf_bytes)])
+        return outline_to_dict(results[0]["title"], results[0]["outline"]), timing
+
+    def rank(self, persona, job, documents):
+        """Return the Round 1B ranking of the documents' sections for a persona and job."""
+        results, timing = self.parse(documents)
+        started = time.time()
+        sections = [section for result in results for section in result["sections"]]
+        subsections = [subsection for result in results for subsection in result["subsections"]]
+        with self.model_lock:
+            ranked_sections, ranked_subsections = rank_sections_and_subsections(sections, subsections, job, self.model,
+                                                                                self.batch_size)
+        timing["rank_ms"] = (time.time() - started) * 1000
+        output = build_output(persona, job, [result["pdf_path"] for result in results], ranked_sections,
+                              ranked_subsections)
+        return output, timing
+
+    def health(self):
+        """Return queue depth and request counters."""
+        with self.lock:
+            return {"status": "ok", "pending_documents": self.pending, "capacity": self.capacity,
+                    "requests": self.requests, "rejected": self.rejected}
+
+def _decode_documents(payload):
+    """Validate a /rank payload's documents and return (filename, bytes) pairs."""
+    documents = payload.get("documents")
+    if not isinstance(documents, list) or not documents:
+        raise ServiceError(400, "documents must be a non-empty list")
+    decoded = []
+    for i, document in enumerate(documents):
+        try:
+            decoded.append((document.get("filename") or f"document_{i + 1}.pdf",
+                            base64.b64decode(document["content"], validate=True)))
+        except (AttributeError, KeyError, TypeError, binascii.Error):
+            raise ServiceError(400, f"documents[{i}] needs a base64 'content' field")
+    return decoded
+
+def make_handler(service):
+    """Build the request handler class bound to a PipelineService."""
+
+    class Handler(BaseHTTPRequestHandler):
+        def _send_json(self, status, body, headers=None):
+            encoded = json.dumps(body, ensure_ascii=False).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(encoded)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(encoded)
+
+        def _read_body(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            if length <= 0:
+                raise ServiceError(400, "request body is empty")
+            if length > MAX_BODY_BYTES:
+                raise ServiceError(413, f"request body exceeds {MAX_BODY_BYTES} bytes")
+            return self.rfile.read(length)
+
+        def do_GET(self):
+            if urlparse(self.path).path == "/health":
+                self._send_json(200, service.health())
+            else:
+                self._send_json(404, {"error": "not found"})
+
+        def do_POST(self):
+            received = time.time()
+            url = urlparse(self.path)
+            try:
+                if url.path == "/outline":
+                    filename = parse_qs(url.query).get("filename", ["upload.pdf"])[0]
+                    body, timing = service.outline(filename, self._read_body())
+                elif url.path == "/rank":
+                    try:
+                        payload = json.loads(self._read_body())
+                    except ValueError:
+                        raise ServiceError(400, "body must be JSON")
+                    if not isinstance(payload, dict) or "persona" not in payload or "job_to_be_done" not in payload:
+                        raise ServiceError(400, "persona and job_to_be_done are required")
+                    body, timing = service.rank(payload["persona"], payload["job_to_be_done"],
+                                                _decode_documents(payload))
+                else:
+                    raise ServiceError(404, "not found")
+            except ServiceError as error:
+                headers = {"Retry-After": "1"} if error.status == 503 else None
+                self._send_json(error.status, {"error": str(error)}, headers)
+                return
+            except Exception as error:
+                self._send_json(500, {"error": f"{type(error).__name__}: {error}"})
+                return
+            timing["total_ms"] = (time.time() - received) * 1000
+            body["timing"] = timing
+            self._send_json(200, body)
+
+    return Handler
+
+def parse_args(argv=None):
+    """Parse command-line options."""
+    parser = argparse.ArgumentParser(description="Serve Round 1A outlines and Round 1B rankings over HTTP.")
+    parser.add_argument("--host", default="127.0.0.1", help="Address to listen on")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="Port to listen on")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="Processes parsing PDFs in parallel")
+    parser.add_argument("--max-queue", type=int, default=DEFAULT_MAX_QUEUE,
+                        help="Documents allowed to wait for a worker before requests are rejected with 503")
+    parser.add_argument("--request-timeout", type=float, default=DEFAULT_REQUEST_TIMEOUT,
+                        help="Seconds a request may wait for parsing before it fails with 504")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE,
+                        help="Number of texts per embedding batch")
+    parser.add_argument("--cache-dir", default=None, help="Directory for the extraction cache (default: none)")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    """Load the model once and serve until interrupted."""
+    args = parse_args(argv)
+    model = load_model(DEFAULT_MODEL_NAME)
+    extraction_cache_dir = os.path.join(args.cache_dir, "extraction") if args.cache_dir else None
+    service = PipelineService(model, args.workers, args.max_queue, args.request_timeout, args.batch_size,
+                              extraction_cache_dir)
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(service))
+    print(f"Serving on http://{args.host}:{args.port} with {args.workers} parsing workers")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.executor.shutdown(cancel_futures=True)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,30 @@
+"""Check running header/footer detection against page geometry."""
+import os
+import sys
+import pymupdf
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pdf_processor import load_pdf, get_page_heights, extract_line_table, close_document
+from heading_detector import merge_lines, mark_boilerplate
+
+
+def test_footer_on_rotated_pages_is_boilerplate(tmp_path):
+    # Portrait media boxes shown landscape: line coordinates are in the rotated 842 x 595 space
+    pdf_path = str(tmp_path / "rotated.pdf")
+    document = pymupdf.open()
+    for page_number in range(5):
+        page = document.new_page(width=595, height=842)
+        page.set_rotation(90)
+        page.insert_text((72, 100), f"Body text on page {page_number + 1}", fontsize=10)
+        page.insert_text((72, 580), "Company Confidential", fontsize=10)
+    document.save(pdf_path)
+    document.close()
+
+    document = load_pdf(pdf_path)
+    page_heights = get_page_heights(document)
+    merged_lines = merge_lines(extract_line_table(document))
+    close_document(document)
+    assert page_heights == [595.0] * 5
+    boilerplate = mark_boilerplate(merged_lines, page_heights)
+    assert [text for text, excluded in zip(merged_lines.text, boilerplate) if excluded] == ["Company Confidential"] * 5
@@ -0,0 +1,80 @@
+"""Check that the LineTable, page-parallel, streaming and incremental paths give the serial outline."""
+import os
+import sys
+import pytest
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+from pdf_processor import load_pdf, get_document_title, get_page_heights, extract_line_table, iter_page_tables, close_document
+from heading_detector import (merge_lines, mark_boilerplate, compute_heading_confidence, assign_heading_levels,
+                              detect_headings_streaming)
+from page_parallel import detect_headings_parallel
+from incremental_outline import iter_outline_events, replay_outline_events
+
+# A one-page form, a multi-page report, and guides with running headers and footers
+SAMPLE_PDFS = [
+    os.path.join("dataset", "Challenge - 1(a)", "Datasets", "Pdfs", "E0CCG5S239.pdf"),
+    os.path.join("dataset", "Challenge - 1(a)", "Datasets", "Pdfs", "E0H1CM114.pdf"),
+    os.path.join("dataset", "Challenge_1b", "Collection 1", "PDFs", "South of France - Cities.pdf"),
+    os.path.join("dataset", "Challenge_1b", "Collection 2", "PDFs", "Learn Acrobat - Export_1.pdf"),
+    os.path.join("dataset", "Challenge_1b", "Collection 3", "PDFs", "Dinner Ideas - Mains_1.pdf"),
+]
+
+
+@pytest.fixture(params=SAMPLE_PDFS, ids=os.path.basename)
+def sample(request):
+    """Open a sample PDF and run the serial outline path on it."""
+    pdf_path = os.path.join(REPO_DIR, request.param)
+    if not os.path.exists(pdf_path):
+        pytest.skip(f"{request.param} is not in the dataset")
+    document = load_pdf(pdf_path)
+    title = get_document_title(document)
+    table = extract_line_table(document)
+    merged_lines = merge_lines(table)
+    boilerplate = mark_boilerplate(merged_lines, get_page_heights(document))
+    potential_headings, updated_title = compute_heading_confidence(merged_lines, title, excluded=boilerplate)
+    yield {
+        "pdf_path": pdf_path,
+        "document": document,
+        "title": title,
+        "table": table,
+        "merged_lines": merged_lines,
+        "boilerplate": boilerplate,
+        "updated_title": updated_title,
+        "outline": assign_heading_levels(potential_headings)
+    }
+    close_document(document)
+
+
+def test_merge_lines_matches_records(sample):
+    merged_records = merge_lines(sample["table"].to_records())
+    assert sample["merged_lines"].to_records() == merged_records
+
+
+def test_heading_confidence_matches_records(sample):
+    potential_headings, updated_title = compute_heading_confidence(sample["merged_lines"].to_records(), sample["title"],
+                                                                   excluded=sample["boilerplate"].tolist())
+    assert updated_title == sample["updated_title"]
+    assert assign_heading_levels(potential_headings) == sample["outline"]
+
+
+def test_page_parallel_matches_serial(sample):
+    updated_title, outline, merged_lines = detect_headings_parallel(sample["pdf_path"], 2)
+    assert updated_title == sample["updated_title"]
+    assert outline == sample["outline"]
+    assert merged_lines.to_records() == sample["merged_lines"].take(~sample["boilerplate"]).to_records()
+
+
+def test_streaming_matches_serial(sample):
+    document = sample["document"]
+    updated_title, outline, _ = detect_headings_streaming(lambda: iter_page_tables(document), sample["title"],
+                                                          get_page_heights(document))
+    assert updated_title == sample["updated_title"]
+    assert outline == sample["outline"]
+
+
+def test_replayed_events_match_serial(sample):
+    updated_title, outline = replay_outline_events(iter_outline_events(sample["document"]))
+    assert updated_title == sample["updated_title"]
+    assert outline == sample["outline"]
@@ -0,0 +1,88 @@
+"""Check that page fingerprints see every font change that alters the extracted lines."""
+import os
+import sys
+import numpy as np
+import pymupdf
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pdf_processor import load_pdf, extract_line_table, page_fingerprint, close_document
+from extraction_cache import ExtractionCache, PageStore
+
+# Each variant keeps the content stream and the font's name and encoding name, changing only the font dictionary
+FONT_VARIANTS = {
+    "plain": {},
+    "widths": {"FirstChar": "32", "LastChar": "126", "Widths": "[" + " ".join(["900"] * 95) + "]"},
+    "differences": {"Encoding": "<< /Type /Encoding /BaseEncoding /WinAnsiEncoding /Differences [72 /Z] >>"},
+}
+
+
+def write_variant(pdf_path, font_keys):
+    """Write a one-page PDF with a single line of Helvetica text and the given font dictionary keys."""
+    document = pymupdf.open()
+    page = document.new_page()
+    page.insert_text((72, 100), "Hello World heading", fontsize=14, fontname="helv")
+    font_xref = page.get_fonts()[0][0]
+    for key, value in font_keys.items():
+        document.xref_set_key(font_xref, key, value)
+    document.save(pdf_path)
+    document.close()
+
+
+def tables_equal(table, other):
+    return all(np.array_equal(column, other_column)
+               for column, other_column in zip(table.to_arrays().values(), other.to_arrays().values()))
+
+
+def test_font_dictionary_changes_fingerprint(tmp_path):
+    fingerprints = {}
+    texts = {}
+    for name, font_keys in FONT_VARIANTS.items():
+        pdf_path = str(tmp_path / f"{name}.pdf")
+        write_variant(pdf_path, font_keys)
+        document = load_pdf(pdf_path)
+        fingerprints[name] = page_fingerprint(document[0])
+        table = extract_line_table(document)
+        texts[name] = (table.text[0], float(table.x1[0]))
+        close_document(document)
+    # The variants extract differently, so none of them may share a fingerprint
+    assert len(set(texts.values())) == len(FONT_VARIANTS)
+    assert len(set(fingerprints.values())) == len(FONT_VARIANTS)
+
+
+def test_page_store_never_copies_lines_across_font_changes(tmp_path):
+    page_store = PageStore()
+    for name, font_keys in FONT_VARIANTS.items():
+        pdf_path = str(tmp_path / f"{name}.pdf")
+        write_variant(pdf_path, font_keys)
+        document = load_pdf(pdf_path)
+        shared = extract_line_table(document, page_store=page_store)
+        assert tables_equal(shared, extract_line_table(document))
+        close_document(document)
+    assert page_store.hits == 0
+
+
+def test_incremental_font_update_is_extracted_again(tmp_path):
+    pdf_path = str(tmp_path / "document.pdf")
+    write_variant(pdf_path, FONT_VARIANTS["plain"])
+    cache = ExtractionCache(str(tmp_path / "cache"))
+    document = load_pdf(pdf_path)
+    extract_line_table(document, cache)
+    close_document(document)
+
+    # Rewrite only the font dictionary in an incremental update; the content stream is untouched
+    document = pymupdf.open(pdf_path)
+    font_xref = document[0].get_fonts()[0][0]
+    for key, value in FONT_VARIANTS["differences"].items():
+        document.xref_set_key(font_xref, key, value)
+    document.saveIncr()
+    close_document(document)
+
+    cache = ExtractionCache(str(tmp_path / "cache"))
+    document = load_pdf(pdf_path)
+    table = extract_line_table(document, cache)
+    cold_table = extract_line_table(document)
+    close_document(document)
+    assert cache.pages_reused == 0
+    assert table.text == cold_table.text == ["Zello World heading"]
+    assert tables_equal(table, cold_table)